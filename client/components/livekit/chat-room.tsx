@@ -3,7 +3,7 @@ import { useState, useEffect, useRef, useCallback } from 'react'
 import { LiveKitRoom, useChat } from '@livekit/components-react'
 import { Button } from '@/components/ui/button'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
-import { apiService } from '@/lib/services/api'
+import { apiService, ChatHistory } from '@/lib/services/api'
 import { toast } from 'sonner'
 import { Textarea } from '@/components/ui/textarea'
 import { ArrowDown, Send } from 'lucide-react'
@@ -28,22 +28,19 @@ export function ChatRoom({ roomName, username, onLeave }: ChatRoomProps) {
       try {
         setIsConnecting(true)
         
-        // Join room and get AI greeting
-        const joinResult = await apiService.joinRoom(roomName, effectiveUsername)
+        // Join room, get AI greeting and token in a single round trip
+        const joinResult = await apiService.joinRoomFull(roomName, effectiveUsername)
         if (!joinResult.success) {
-          console.log('Failed to join room:', joinResult.error)
-        } else if (joinResult.data?.greeting) {
+          const errorMsg = joinResult.error || 'Failed to join room'
+          toast.error(errorMsg)
+          throw new Error(errorMsg)
+        }
+        if (joinResult.data?.greeting) {
           // Show AI greeting as a toast
           toast.success(joinResult.data.greeting)
         }
 
-        const tokenResult = await apiService.getToken(roomName, effectiveUsername)
-        if (!tokenResult.success) {
-          const errorMsg = tokenResult.error || 'Failed to get token'
-          toast.error(errorMsg)
-          throw new Error(errorMsg)
-        }
-        setToken(tokenResult.data!.token)
+        setToken(joinResult.data!.token)
         setError('')
       } catch (err) {
         const errorMessage = err instanceof Error ? err.message : 'Failed to initialize room'
@@ -126,6 +123,9 @@ function ChatRoomContent({ roomName, username, displayName, onLeave }: {
   const [isSendingApi, setIsSendingApi] = useState(false)
   const [showScrollButton, setShowScrollButton] = useState(false)
   const [isAiThinking, setIsAiThinking] = useState(false)
+  const [streamingResponse, setStreamingResponse] = useState('')
+  const abortRef = useRef<AbortController | null>(null)
+  const historySeqRef = useRef<number | null>(null)
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const messagesContainerRef = useRef<HTMLDivElement>(null)
   const textareaRef = useRef<HTMLTextAreaElement>(null)
@@ -142,11 +142,33 @@ function ChatRoomContent({ roomName, username, displayName, onLeave }: {
     setIsSendingApi(true)
     
     try {
-      const chatMessagesForAPI = chatMessages.map(msg => ({
+      const chatMessagesForAPI = () => chatMessages.map(msg => ({
         role: msg.from?.identity === username ? 'user' : 'assistant',
         content: msg.message,
       }))
-      const result = await apiService.sendMessage(roomName, username, userMessage, chatMessagesForAPI)
+      const streamWith = (history: ChatHistory) => {
+        abortRef.current = new AbortController()
+        return apiService.streamMessage(
+          roomName,
+          username,
+          userMessage,
+          history,
+          (token) => setStreamingResponse(prev => prev + token),
+          abortRef.current.signal
+        )
+      }
+      // After the first turn the server keeps the history; only resend it when asked to resync
+      let result = await streamWith(
+        historySeqRef.current === null
+          ? { chatMessages: chatMessagesForAPI() }
+          : { seq: historySeqRef.current }
+      )
+      if (!result.success && result.resync) {
+        result = await streamWith({ chatMessages: chatMessagesForAPI() })
+      }
+      if (result.data?.seq !== undefined) {
+        historySeqRef.current = result.data.seq
+      }
       if (result.success && result.data?.response) {
         await send(`[AI]: ${result.data.response}`)
       } else {
@@ -156,11 +178,18 @@ function ChatRoomContent({ roomName, username, displayName, onLeave }: {
       console.error('Error sending message:', error)
       toast.error('An error occurred while sending the message')
     } finally {
+      abortRef.current = null
+      setStreamingResponse('')
       setIsAiThinking(false)
       setIsSendingApi(false)
     }
   }
 
+  // Cancel an in-flight AI response when leaving the room
+  useEffect(() => {
+    return () => abortRef.current?.abort()
+  }, [])
+
   // Handle Enter key press
   const handleKeyPress = (e: React.KeyboardEvent) => {
     if (e.key === 'Enter' && !e.shiftKey) {
@@ -296,6 +325,11 @@ function ChatRoomContent({ roomName, username, displayName, onLeave }: {
                 <div className="text-xs font-medium mb-1 text-muted-foreground">
                   AI Assistant
                 </div>
+                {streamingResponse ? (
+                  <div className="text-sm leading-relaxed whitespace-pre-wrap">
+                    {streamingResponse}
+                  </div>
+                ) : (
                 <div className="flex items-center gap-2 text-sm">
                   <div className="flex gap-1">
                     <div className="w-2 h-2 bg-gray-400 rounded-full animate-bounce" style={{ animationDelay: '0ms' }}></div>
@@ -304,6 +338,7 @@ function ChatRoomContent({ roomName, username, displayName, onLeave }: {
                   </div>
                   <span className="text-muted-foreground">AI is thinking...</span>
                 </div>
+                )}
               </div>
             </div>
           </div>
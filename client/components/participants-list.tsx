@@ -1,9 +1,10 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState } from 'react'
 import { Button } from '@/components/ui/button'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { apiService } from '@/lib/services/api'
+import { useLiveListing } from '@/lib/hooks/use-live-listing'
 import { toast } from 'sonner'
 import Link from 'next/link'
 import { ArrowLeft, UserMinus, User } from 'lucide-react'
@@ -20,30 +21,13 @@ interface ParticipantsListProps {
 }
 
 export default function ParticipantsList({ roomName }: ParticipantsListProps) {
-  const [participants, setParticipants] = useState<Participant[]>([])
-  const [loading, setLoading] = useState(true)
+  // Loaded over REST, then kept current by /events (joins, leaves and metadata changes arrive as diffs), or by polling while it is down
+  const { items: participants, loading } = useLiveListing<Participant>('identity', {
+    room: roomName,
+    fields: ['identity', 'sid', 'name', 'metadata']
+  })
   const [removingParticipant, setRemovingParticipant] = useState<string | null>(null)
 
-  useEffect(() => {
-    fetchParticipants()
-  }, [roomName])
-
-  const fetchParticipants = async () => {
-    try {
-      setLoading(true)
-      const result = await apiService.listParticipants(roomName)
-      if (result.success && result.data?.participants) {
-        setParticipants(result.data.participants)
-      } else {
-        toast.error(result.error || 'Failed to fetch participants')
-      }
-    } catch (error) {
-      toast.error('An error occurred while fetching participants')
-    } finally {
-      setLoading(false)
-    }
-  }
-
   const handleRemoveParticipant = async (identity: string) => {
     if (!confirm(`Are you sure you want to remove participant "${identity}"?`)) {
       return
@@ -54,7 +38,6 @@ export default function ParticipantsList({ roomName }: ParticipantsListProps) {
       const result = await apiService.removeParticipant(roomName, identity)
       if (result.success) {
         toast.success('Participant removed successfully')
-        fetchParticipants() // Refresh the list
       } else {
         toast.error(result.error || 'Failed to remove participant')
       }
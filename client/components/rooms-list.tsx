@@ -1,9 +1,10 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState } from 'react'
 import { Button } from '@/components/ui/button'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { apiService } from '@/lib/services/api'
+import { useLiveListing } from '@/lib/hooks/use-live-listing'
 import { toast } from 'sonner'
 import Link from 'next/link'
 import { Trash2, Users, MessageCircle } from 'lucide-react'
@@ -14,30 +15,10 @@ interface Room {
 }
 
 export default function RoomsList() {
-  const [rooms, setRooms] = useState<Room[]>([])
-  const [loading, setLoading] = useState(true)
+  // Loaded over REST, then kept current by /events (deletions and new rooms arrive as diffs), or by polling while it is down
+  const { items: rooms, loading } = useLiveListing<Room>('name', { fields: ['name', 'sid'] })
   const [deletingRoom, setDeletingRoom] = useState<string | null>(null)
 
-  useEffect(() => {
-    fetchRooms()
-  }, [])
-
-  const fetchRooms = async () => {
-    try {
-      setLoading(true)
-      const result = await apiService.listRooms()
-      if (result.success && result.data?.rooms) {
-        setRooms(result.data.rooms)
-      } else {
-        toast.error(result.error || 'Failed to fetch rooms')
-      }
-    } catch (error) {
-      toast.error('An error occurred while fetching rooms')
-    } finally {
-      setLoading(false)
-    }
-  }
-
   const handleDeleteRoom = async (roomName: string) => {
     if (!confirm(`Are you sure you want to delete room "${roomName}"?`)) {
       return
@@ -48,7 +29,6 @@ export default function RoomsList() {
       const result = await apiService.deleteRoom(roomName)
       if (result.success) {
         toast.success('Room deleted successfully')
-        fetchRooms() // Refresh the list
       } else {
         toast.error(result.error || 'Failed to delete room')
       }
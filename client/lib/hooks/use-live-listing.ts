@@ -0,0 +1,122 @@
+import { useEffect, useState } from 'react'
+import { apiService } from '@/lib/services/api'
+
+// While /events is down the list is polled over REST at this interval, doubling after each failed
+// poll (e.g. a 429) up to MAX_POLL_INTERVAL_MS; a stream that has sent nothing after
+// STREAM_TIMEOUT_MS (e.g. behind a proxy that buffers responses) counts as down
+const POLL_INTERVAL_MS = 5000
+const MAX_POLL_INTERVAL_MS = 60000
+const STREAM_TIMEOUT_MS = 10000
+
+// Keeps a room or participant list current from /events, applying diffs by `key`.
+// The first load comes from /listRooms or /listParticipants so the list does not wait for the stream,
+// and those are polled whenever the stream errors (including a 503 when the server is at its
+// subscriber limit) until it delivers again.
+export const useLiveListing = <T extends Record<string, any>>(
+  key: keyof T & string,
+  options: { room?: string; fields?: string[] }
+): { items: T[]; loading: boolean; connected: boolean } => {
+  const [items, setItems] = useState<T[]>([])
+  const [loading, setLoading] = useState(true)
+  const [connected, setConnected] = useState(false)
+  const fields = options.fields?.join(',')
+
+  useEffect(() => {
+    let live = false
+    let closed = false
+    let polling = false
+    let poller: ReturnType<typeof setTimeout> | null = null
+    let pollDelay = POLL_INTERVAL_MS
+    let silence: ReturnType<typeof setTimeout> | null = null
+
+    // Resolves to whether the listing was fetched
+    const load = async () => {
+      const result = options.room
+        ? await apiService.listParticipants(options.room, { fields: options.fields })
+        : await apiService.listRooms({ fields: options.fields })
+      // Once the stream is live its snapshot and diffs are newer than any poll
+      if (closed || live) return result.success
+      if (result.success && result.data) {
+        const data = result.data as unknown as { rooms?: T[]; participants?: T[] }
+        setItems((options.room ? data.participants : data.rooms) ?? [])
+      }
+      setLoading(false)
+      return result.success
+    }
+
+    const poll = async () => {
+      poller = null
+      const ok = await load()
+      // Stopped meanwhile, or restarted with a timer of its own
+      if (!polling || poller !== null) return
+      pollDelay = ok ? POLL_INTERVAL_MS : Math.min(pollDelay * 2, MAX_POLL_INTERVAL_MS)
+      poller = setTimeout(poll, pollDelay)
+    }
+
+    const startPolling = () => {
+      if (polling) return
+      polling = true
+      pollDelay = POLL_INTERVAL_MS
+      poller = setTimeout(poll, pollDelay)
+    }
+
+    const stopPolling = () => {
+      polling = false
+      if (poller !== null) clearTimeout(poller)
+      poller = null
+    }
+
+    const markLive = () => {
+      live = true
+      if (silence !== null) clearTimeout(silence)
+      stopPolling()
+      setLoading(false)
+      setConnected(true)
+    }
+
+    setLoading(true)
+    load()
+    silence = setTimeout(startPolling, STREAM_TIMEOUT_MS)
+    const unsubscribe = apiService.subscribeEvents<T>(
+      { room: options.room, fields: options.fields },
+      {
+        onSnapshot: snapshot => {
+          markLive()
+          setItems(snapshot.items)
+        },
+        onDiff: diff => {
+          markLive()
+          setItems(current => {
+            const changed = new Map<string, T>()
+            for (const item of [...diff.added, ...diff.updated]) changed.set(item[key], item)
+            const removed = new Set(diff.removed)
+            const next = current
+              .filter(item => !removed.has(item[key]))
+              .map(item => changed.get(item[key]) ?? item)
+            const present = new Set(next.map(item => item[key]))
+            return next.concat(diff.added.filter(item => !present.has(item[key])))
+          })
+        },
+        // EventSource retries on its own (unless the server refused it); poll until it is back
+        onError: () => {
+          live = false
+          setConnected(false)
+          if (!polling) {
+            load()
+            startPolling()
+          }
+        }
+      }
+    )
+
+    return () => {
+      closed = true
+      if (silence !== null) clearTimeout(silence)
+      stopPolling()
+      unsubscribe()
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [key, options.room, fields])
+
+  return { items, loading, connected }
+}
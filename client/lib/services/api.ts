@@ -18,34 +18,97 @@ export interface RoomInfo {
   max_participants?: number;
 }
 
+// Optional filtering, paging and field projection for the listing endpoints
+export interface ListOptions {
+  fields?: string[];
+  prefix?: string;
+  limit?: number;
+  cursor?: string;
+}
+
+// Events pushed on /events: the full list first, then only what changed
+export interface ListingSnapshot<T> {
+  topic: string;
+  seq: number;
+  items: T[];
+}
+
+export interface ListingDiff<T> {
+  topic: string;
+  seq: number;
+  added: T[];
+  updated: T[];
+  removed: string[];
+}
+
+export interface ListingEventHandlers<T> {
+  onSnapshot: (snapshot: ListingSnapshot<T>) => void;
+  onDiff: (diff: ListingDiff<T>) => void;
+  onError?: () => void;
+}
+
 export interface TokenResponse {
   token: string;
 }
 
 export interface ChatResponse {
   response: string;
+  seq?: number;
+}
+
+// Either the seq returned by the previous turn, or the full history to (re)sync the server's copy
+export interface ChatHistory {
+  seq?: number;
+  chatMessages?: any[];
+}
+
+export interface JoinRoomFullResponse {
+  success: boolean;
+  greeting: string;
+  room: RoomInfo;
+  token: string;
+  available: boolean;
+  participants: any[];
+  timings: Record<string, number>;
 }
 
 export interface ApiResponse<T> {
   success: boolean;
   data?: T;
   error?: string;
+  resync?: boolean;
 }
 
 class ApiService {
+  // Last ETag and body per listing request, sent back as If-None-Match so unchanged polls return an empty 304
+  private validated = new Map<string, { etag: string; data: unknown }>();
+
   private async request<T>(
     endpoint: string,
-    options: RequestInit = {}
+    options: RequestInit = {},
+    revalidate = false
   ): Promise<ApiResponse<T>> {
     try {
+      const cacheKey = revalidate ? `${options.method || 'GET'} ${endpoint} ${options.body || ''}` : '';
+      const cached = revalidate ? this.validated.get(cacheKey) : undefined;
       const response = await fetch(`${API_BASE_URL}${endpoint}`, {
         headers: {
           'Content-Type': 'application/json',
+          ...(cached ? { 'If-None-Match': cached.etag } : {}),
           ...options.headers,
         },
+        // The browser cache would otherwise answer for us and hide the 304
+        ...(revalidate ? { cache: 'no-store' as RequestCache } : {}),
         ...options,
       });
 
+      if (response.status === 304 && cached) {
+        return {
+          success: true,
+          data: cached.data as T,
+        };
+      }
+
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({}));
         let errorMessage = errorData.error || `HTTP ${response.status}: ${response.statusText}`;
@@ -66,6 +129,10 @@ class ApiService {
       }
 
       const data = await response.json();
+      const etag = response.headers.get('ETag');
+      if (revalidate && etag) {
+        this.validated.set(cacheKey, { etag, data });
+      }
       return {
         success: true,
         data,
@@ -106,9 +173,23 @@ class ApiService {
     });
   }
 
-  async listRooms(): Promise<ApiResponse<{ rooms: RoomInfo[] }>> {
+  async getTokens(roomName: string, identities: string[]): Promise<ApiResponse<{ tokens: Record<string, string> }>> {
+    console.log('Getting tokens for room:', roomName, 'identities:', identities.length);
+    return this.request<{ tokens: Record<string, string> }>('/getTokens', {
+      method: 'POST',
+      body: JSON.stringify({ roomName, identities }),
+    });
+  }
+
+  async listRooms(options: ListOptions = {}): Promise<ApiResponse<{ rooms: RoomInfo[]; next_cursor?: string | null }>> {
     console.log('Listing rooms');
-    return this.request<{ rooms: RoomInfo[] }>('/listRooms');
+    const params = new URLSearchParams();
+    if (options.fields) params.set('fields', options.fields.join(','));
+    if (options.prefix) params.set('prefix', options.prefix);
+    if (options.limit) params.set('limit', String(options.limit));
+    if (options.cursor) params.set('cursor', options.cursor);
+    const query = params.toString();
+    return this.request<{ rooms: RoomInfo[]; next_cursor?: string | null }>(`/listRooms${query ? `?${query}` : ''}`, {}, true);
   }
 
   async deleteRoom(roomName: string): Promise<ApiResponse<any>> {
@@ -119,12 +200,26 @@ class ApiService {
     });
   }
 
-  async listParticipants(roomName: string): Promise<ApiResponse<{ participants: any[] }>> {
+  async listParticipants(roomName: string, options: ListOptions = {}): Promise<ApiResponse<{ participants: any[]; next_cursor?: string | null }>> {
     console.log('Listing participants for room:', roomName);
-    return this.request<{ participants: any[] }>('/listParticipants', {
+    return this.request<{ participants: any[]; next_cursor?: string | null }>('/listParticipants', {
       method: 'POST',
-      body: JSON.stringify({ roomName }),
-    });
+      body: JSON.stringify({ roomName, ...options }),
+    }, true);
+  }
+
+  // Subscribes to the room list, or to one room's participants, over SSE. Returns a function that closes the stream.
+  // EventSource reconnects by itself and sends Last-Event-ID, so only missed diffs (or a fresh snapshot) follow.
+  subscribeEvents<T>(options: { room?: string; fields?: string[] }, handlers: ListingEventHandlers<T>): () => void {
+    const params = new URLSearchParams();
+    if (options.room) params.set('room', options.room);
+    if (options.fields) params.set('fields', options.fields.join(','));
+    const query = params.toString();
+    const source = new EventSource(`${API_BASE_URL}/events${query ? `?${query}` : ''}`);
+    source.addEventListener('snapshot', (event) => handlers.onSnapshot(JSON.parse((event as MessageEvent).data)));
+    source.addEventListener('diff', (event) => handlers.onDiff(JSON.parse((event as MessageEvent).data)));
+    source.onerror = () => handlers.onError?.();
+    return () => source.close();
   }
 
   async removeParticipant(roomName: string, identity: string): Promise<ApiResponse<any>> {
@@ -143,6 +238,63 @@ class ApiService {
     });
   }
 
+  // Streams the AI response over SSE, calling onToken for each chunk. Returns the full response.
+  async streamMessage(
+    roomName: string,
+    username: string,
+    message: string,
+    history: ChatHistory,
+    onToken: (token: string) => void,
+    signal?: AbortSignal
+  ): Promise<ApiResponse<ChatResponse>> {
+    try {
+      const response = await fetch(`${API_BASE_URL}/chat`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+        body: JSON.stringify({ roomName, username, message, ...history, stream: true }),
+        signal,
+      });
+      if (!response.ok || !response.body) {
+        const errorData = await response.json().catch(() => ({}));
+        const errorMessage = response.status === 429
+          ? 'Rate limit exceeded. Please wait a moment before trying again.'
+          : errorData.error || `HTTP ${response.status}: ${response.statusText}`;
+        return { success: false, error: errorMessage, resync: response.status === 409 && !!errorData.resync };
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          let event = 'message';
+          let data = '';
+          for (const line of frame.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          if (!data) continue;
+          const payload = JSON.parse(data);
+          if (event === 'done') return { success: true, data: { response: payload.response, seq: payload.seq } };
+          if (event === 'error') return { success: false, error: payload.error };
+          if (payload.token) onToken(payload.token);
+        }
+      }
+      return { success: false, error: 'Stream ended before the response completed.' };
+    } catch (error) {
+      return {
+        success: false,
+        error: error instanceof Error ? error.message : 'Unknown error occurred',
+      };
+    }
+  }
+
   async moveParticipant(roomName: string, identity: string, destinationRoomName: string): Promise<ApiResponse<any>> {
     console.log('Moving participant:', identity, 'from room:', roomName, 'to room:', destinationRoomName);
     return this.request('/moveParticipant', {
@@ -167,6 +319,14 @@ class ApiService {
     });
   }
 
+  async batch(operations: any[], concurrency?: number): Promise<ApiResponse<{ results: any[]; succeeded: number; failed: number }>> {
+    console.log('Running batch of', operations.length, 'operations');
+    return this.request<{ results: any[]; succeeded: number; failed: number }>('/batch', {
+      method: 'POST',
+      body: JSON.stringify({ operations, concurrency }),
+    });
+  }
+
   async checkUsername(roomName: string, username: string): Promise<ApiResponse<{ available: boolean; message: string }>> {
     console.log('Checking username availability:', username, 'in room:', roomName);
     return this.request<{ available: boolean; message: string }>('/checkUsername', {
@@ -175,6 +335,14 @@ class ApiService {
     });
   }
 
+  async checkUsernames(roomName: string, usernames: string[]): Promise<ApiResponse<{ available: Record<string, boolean>; roomExists: boolean }>> {
+    console.log('Checking username availability:', usernames, 'in room:', roomName);
+    return this.request<{ available: Record<string, boolean>; roomExists: boolean }>('/checkUsernames', {
+      method: 'POST',
+      body: JSON.stringify({ roomName, usernames }),
+    });
+  }
+
   async joinRoom(roomName: string, username: string): Promise<ApiResponse<{ success: boolean; greeting: string; room: any }>> {
     console.log('Joining room:', roomName, 'with username:', username);
     return this.request<{ success: boolean; greeting: string; room: any }>('/joinRoom', {
@@ -182,6 +350,14 @@ class ApiService {
       body: JSON.stringify({ roomName, username }),
     });
   }
+
+  async joinRoomFull(roomName: string, username: string): Promise<ApiResponse<JoinRoomFullResponse>> {
+    console.log('Joining room (full):', roomName, 'with username:', username);
+    return this.request<JoinRoomFullResponse>('/joinRoom', {
+      method: 'POST',
+      body: JSON.stringify({ roomName, username, mode: 'full' }),
+    });
+  }
 }
 
 export const apiService = new ApiService();
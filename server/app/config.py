@@ -1,4 +1,6 @@
 import os
+import json
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,4 +13,111 @@ AGENT_NAME = os.getenv("AGENT_NAME", "python-agent")
 MEM0_API_KEY = os.getenv("MEM0_API_KEY")
 MEMO_ORG_ID = os.getenv("MEMO_ORG_ID")
 MEMO_PROJECT_ID = os.getenv("MEMO_PROJECT_ID")
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
\ No newline at end of file
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # e.g. a local fake LLM server
+CHAT_MODEL = os.getenv("CHAT_MODEL", "llama-3.1-8b-instant")
+MAX_BULK_TOKENS = int(os.getenv("MAX_BULK_TOKENS", "500"))  # identities per /getTokens or /checkUsernames request
+
+# Server-side chat history per (room, user)
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "10"))
+CONVERSATION_MAX_CHARS = int(os.getenv("CONVERSATION_MAX_CHARS", "16000"))
+CONVERSATION_MAX_COUNT = int(os.getenv("CONVERSATION_MAX_COUNT", "1000"))
+CONVERSATION_IDLE_TTL = float(os.getenv("CONVERSATION_IDLE_TTL", "3600"))
+# SQLite file shared by all workers, so a turn may land on any of them and a memory write
+# invalidates cached searches everywhere; "" keeps both in-process
+CONVERSATION_STORE_PATH = os.getenv(
+    "CONVERSATION_STORE_PATH", os.path.join(tempfile.gettempdir(), "fluentai-conversations.db")
+)
+
+# Write-behind memory persistence
+MEMORY_QUEUE_MAX_DEPTH = int(os.getenv("MEMORY_QUEUE_MAX_DEPTH", "1000"))
+MEMORY_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "20"))
+MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL", "1.0"))
+MEMORY_MAX_RETRIES = int(os.getenv("MEMORY_MAX_RETRIES", "3"))
+MEMORY_RETRY_BACKOFF = float(os.getenv("MEMORY_RETRY_BACKOFF", "0.5"))
+MEMORY_DRAIN_TIMEOUT = float(os.getenv("MEMORY_DRAIN_TIMEOUT", "10"))
+
+# Memory backend ("mem0", "local" or "none") and retrieval
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "none")
+MEMORY_LOCAL_PATH = os.getenv("MEMORY_LOCAL_PATH", "data/memory")
+MEMORY_EMBED_DIM = int(os.getenv("MEMORY_EMBED_DIM", "512"))
+MEMORY_SEARCH_WORKERS = int(os.getenv("MEMORY_SEARCH_WORKERS", "8"))
+MEMORY_SEARCH_CACHE_SIZE = int(os.getenv("MEMORY_SEARCH_CACHE_SIZE", "2048"))
+MEMORY_SEARCH_CACHE_TTL = float(os.getenv("MEMORY_SEARCH_CACHE_TTL", "300"))
+
+# Prompt assembly: total token budget, share for memory snippets, and rolling summary length
+# (opt-in; 0 disables summaries, each of which costs an extra LLM call)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+PROMPT_MEMORY_TOKENS = int(os.getenv("PROMPT_MEMORY_TOKENS", "600"))
+PROMPT_SUMMARY_TOKENS = int(os.getenv("PROMPT_SUMMARY_TOKENS", "0"))
+
+# /chat response cache for identical prompts (same normalized message and context)
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "512"))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "60"))
+
+# LLM routing: JSON list of providers, e.g.
+# [{"name": "groq", "model": "llama-3.1-8b-instant", "api_key_env": "GROQ_API_KEY"},
+#  {"name": "openai", "kind": "litellm", "model": "openai/gpt-4o-mini", "api_key_env": "OPENAI_API_KEY"}]
+# When unset, the single Groq model configured above is used.
+LLM_PROVIDERS = json.loads(os.getenv("LLM_PROVIDERS") or "[]")
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "0"))  # seconds; 0 disables hedged requests
+LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))
+LLM_COOLDOWN = float(os.getenv("LLM_COOLDOWN", "30"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "100"))
+
+# Rate limiting: counters shared by all workers on the host (memory:// keeps them per process)
+RATELIMIT_STORAGE_URI = os.getenv(
+    "RATELIMIT_STORAGE_URI", "sqlite:///" + os.path.join(tempfile.gettempdir(), "fluentai-ratelimit.db")
+)
+RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "sliding-window-counter")
+CHAT_RATE_LIMIT = os.getenv("CHAT_RATE_LIMIT", "10 per minute")  # per user and room
+CHAT_IP_RATE_LIMIT = os.getenv("CHAT_IP_RATE_LIMIT", "60 per minute")  # per client address, e.g. a classroom NAT
+# /listRooms and /listParticipants per client address, in place of the default limits: pages fall back
+# to polling them every few seconds, so a classroom of 30 behind one NAT makes a few hundred a minute
+LISTING_RATE_LIMIT = os.getenv("LISTING_RATE_LIMIT", "600 per minute")
+
+# Admission control per worker: concurrent requests, wait queue, longest queue wait and
+# total deadline (seconds) for the chat and join routes; CHAT_MAX_PER_ROOM caps one room
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "16"))
+CHAT_MAX_QUEUE_WAIT = float(os.getenv("CHAT_MAX_QUEUE_WAIT", "2"))
+CHAT_DEADLINE = float(os.getenv("CHAT_DEADLINE", "30"))
+CHAT_MAX_PER_ROOM = int(os.getenv("CHAT_MAX_PER_ROOM", "4"))
+JOIN_MAX_CONCURRENCY = int(os.getenv("JOIN_MAX_CONCURRENCY", "16"))
+JOIN_MAX_QUEUE = int(os.getenv("JOIN_MAX_QUEUE", "32"))
+JOIN_MAX_QUEUE_WAIT = float(os.getenv("JOIN_MAX_QUEUE_WAIT", "1"))
+JOIN_DEADLINE = float(os.getenv("JOIN_DEADLINE", "10"))
+
+# Largest page the listing routes return when a client passes `limit`
+LISTING_MAX_PAGE_SIZE = int(os.getenv("LISTING_MAX_PAGE_SIZE", "500"))
+# Encode JSON responses with orjson when it is installed
+FAST_JSON = os.getenv("FAST_JSON", "true").lower() == "true"
+
+# Response compression: bodies of at least COMPRESS_MIN_SIZE bytes; brotli needs the `brotli` package
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+# Idle room reaper (opt-in): deletes rooms empty for ROOM_IDLE_TIMEOUT seconds, checking every
+# ROOM_REAPER_INTERVAL seconds; ROOM_REAPER_PINNED lists glob patterns of rooms to keep
+ROOM_REAPER_ENABLED = os.getenv("ROOM_REAPER_ENABLED", "false").lower() == "true"
+ROOM_IDLE_TIMEOUT = float(os.getenv("ROOM_IDLE_TIMEOUT", "1800"))
+ROOM_REAPER_INTERVAL = float(os.getenv("ROOM_REAPER_INTERVAL", "60"))
+ROOM_REAPER_MAX_DELETES = int(os.getenv("ROOM_REAPER_MAX_DELETES", "4"))
+ROOM_REAPER_PINNED = [p.strip() for p in os.getenv("ROOM_REAPER_PINNED", "").split(",") if p.strip()]
+ROOM_REAPER_LOCK_PATH = os.getenv("ROOM_REAPER_LOCK_PATH", os.path.join(tempfile.gettempdir(), "fluentai-room-reaper.lock"))
+
+# /events: listing refresh period, diffs kept for resuming, frames a slow subscriber may fall
+# behind before it is resent a snapshot, and per-process cap on open streams. Each open stream
+# holds one of the worker's GUNICORN_THREADS threads, so by default the cap leaves
+# EVENTS_RESERVED_THREADS of them free for every other route.
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "32"))
+EVENTS_RESERVED_THREADS = int(os.getenv("EVENTS_RESERVED_THREADS", "8"))
+EVENTS_REFRESH_INTERVAL = float(os.getenv("EVENTS_REFRESH_INTERVAL", "2"))
+EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", "100"))
+EVENTS_MAX_PENDING = int(os.getenv("EVENTS_MAX_PENDING", "50"))
+EVENTS_LINGER = float(os.getenv("EVENTS_LINGER", "30"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS") or max(1, GUNICORN_THREADS - EVENTS_RESERVED_THREADS))
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+EVENTS_MAX_DURATION = float(os.getenv("EVENTS_MAX_DURATION", "300"))
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
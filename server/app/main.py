@@ -1,47 +1,255 @@
 # app/main.py
-import asyncio
-from flask import Flask, request, jsonify
+import json
+import time
+_import_started = time.perf_counter()
+import hashlib
+import functools
+import threading
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from groq import Groq
-#from mem0 import MemoryClient
 
 from app.config import *
 from app.services.livekit_api_service import *
-import concurrent.futures
+from app.services.event_loop import run_sync
+from app.services.batch_service import run_batch, BatchError
+from app.services.conversation_store import ConversationStore, SharedConversationStore
+from app.services.memory_versions import MemoryVersions, SharedMemoryVersions
+from app.services.memory_queue import MemoryWriteQueue
+from app.services.cache import TTLCache, SingleFlight, FlightAbandoned
+from app.services.memory_backends import create_memory_backend, MemorySearchError
+from app.services.prompt_builder import RollingSummaries, assemble_prompt
+from app.services.llm_router import LLMRouter, build_providers
+from app.services.metrics import REQUEST_LATENCY, MEMORY_LATENCY, render as render_metrics, update_process_metrics
+from app.services import ratelimit_storage  # registers the sqlite:// limiter storage
+from app.services.admission import AdmissionController, RouteClass, Overloaded
+from app.services.lazy import import_timings, warm_imports
+from app.services.listing import paginate, decode_cursor
+from app.services.json_provider import fast_json_provider
+from app.services.room_reaper import RoomReaper
+from app.services.room_events import EventHub
+from app.services.http_cache import Compressor, COMPRESSIBLE_TYPES, choose_encoding, content_etag
 
 app = Flask(__name__)
-CORS(app)
+if FAST_JSON:
+    app.json = fast_json_provider(app) or app.json
+CORS(app, expose_headers=["ETag"])
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"]
+    default_limits=["200 per day", "50 per hour"],
+    storage_uri=RATELIMIT_STORAGE_URI,
+    strategy=RATELIMIT_STRATEGY
 )
 
+def identity_key():
+    """Rate limit key for the user and room named in the request body, falling back to the client address."""
+    data = request.get_json(silent=True) or {}
+    username = data.get('username') or data.get('identity')
+    if not username:
+        return get_remote_address()
+    return f"user:{data.get('roomName')}:{username}"
+
 
 # Rate limit error handler
 @app.errorhandler(429)
 def ratelimit_handler(e):
     return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
 
-# Initialize Groq client
-groq_client = Groq(
-    api_key=GROQ_API_KEY
+# Slow upstream paths are admitted separately so they cannot tie up every worker thread
+admission = AdmissionController(
+    RouteClass("chat", CHAT_MAX_CONCURRENCY, CHAT_MAX_QUEUE, CHAT_MAX_QUEUE_WAIT, CHAT_DEADLINE,
+               max_per_key=CHAT_MAX_PER_ROOM),
+    RouteClass("join", JOIN_MAX_CONCURRENCY, JOIN_MAX_QUEUE, JOIN_MAX_QUEUE_WAIT, JOIN_DEADLINE)
+)
+
+@app.errorhandler(Overloaded)
+def overloaded_handler(e):
+    response = jsonify({"error": "Server is busy. Please try again shortly.", "reason": e.reason})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
+def admitted(route_class, key_func=None):
+    """Runs a view under admission control; streamed responses keep their slot until closed."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            ticket = admission.admit(route_class, key_func() if key_func else None)
+            g.admission_ticket = ticket
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except BaseException:
+                ticket.release()
+                raise
+            if response.is_streamed:
+                response.call_on_close(ticket.release)
+            else:
+                ticket.release()
+            return response
+        return wrapper
+    return decorator
+
+def remaining_time():
+    """Seconds left before the current request's admission deadline, or None outside admission control."""
+    ticket = g.get("admission_ticket")
+    return ticket.remaining() if ticket else None
+
+def request_room():
+    data = request.get_json(silent=True) or {}
+    return data.get('roomName')
+
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+
+# Rooms are created with empty_timeout=0, so with ROOM_REAPER_ENABLED ones left empty are deleted in the background
+room_reaper = RoomReaper(
+    fetch_rooms,
+    delete_room,
+    idle_timeout=ROOM_IDLE_TIMEOUT,
+    interval=ROOM_REAPER_INTERVAL,
+    max_concurrent=ROOM_REAPER_MAX_DELETES,
+    pinned=ROOM_REAPER_PINNED,
+    lock_path=ROOM_REAPER_LOCK_PATH
+)
+
+@app.before_request
+def start_room_reaper():
+    """Starts the reaper in this worker; only the one holding the lock file sweeps."""
+    if ROOM_REAPER_ENABLED:
+        room_reaper.start()
+
+@app.after_request
+def record_request_metrics(response):
+    started_at = g.get("request_started_at")
+    if started_at is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.labels(route, request.method, response.status_code).observe(time.perf_counter() - started_at)
+    update_process_metrics()
+    return response
+
+# Larger JSON bodies are sent gzip- or brotli-compressed when the client accepts it
+compressor = Compressor(
+    min_size=COMPRESS_MIN_SIZE,
+    gzip_level=COMPRESS_GZIP_LEVEL,
+    brotli_quality=COMPRESS_BROTLI_QUALITY
+)
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+        return response
+    body = response.get_data()
+    if len(body) < compressor.min_size:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    etag, _ = response.get_etag()
+    response.set_data(compressor.compress(body, encoding, etag))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+def validated_json(payload):
+    """JSON response carrying a content-hash ETag; a matching If-None-Match gets an empty 304.
+
+    Pollers that send back the last ETag move no body at all while the content
+    is unchanged. The ETag is weak because the bytes on the wire depend on the
+    negotiated compression.
+    """
+    response = jsonify(payload)
+    etag = content_etag(response.get_data())
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    # Caches must revalidate every time, so a changed listing is never served stale
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# Chat completions are routed across the configured LLM providers
+llm_router = LLMRouter(
+    build_providers(
+        LLM_PROVIDERS or [{"name": "groq", "model": CHAT_MODEL, "api_key": GROQ_API_KEY, "base_url": GROQ_BASE_URL}],
+        window=LLM_LATENCY_WINDOW
+    ),
+    hedge_delay=LLM_HEDGE_DELAY,
+    max_error_rate=LLM_MAX_ERROR_RATE,
+    cooldown=LLM_COOLDOWN
 )
-'''
-if MEM0_API_KEY and MEMO_ORG_ID and MEMO_PROJECT_ID:
+# Memory backend behind retrieval and persistence ("mem0", "local" or "none")
+memory_backend = create_memory_backend(
+    MEMORY_BACKEND,
+    mem0_api_key=MEM0_API_KEY if MEMO_ORG_ID and MEMO_PROJECT_ID else None,
+    search_workers=MEMORY_SEARCH_WORKERS,
+    local_path=MEMORY_LOCAL_PATH,
+    embed_dim=MEMORY_EMBED_DIM
+)
+
+def add_memories(messages, user_ids):
+    """Writes merged chat turns for one or more memory ids to the memory backend, timing the call."""
+    start = time.perf_counter()
+    outcome = "error"
     try:
-        mem0 = MemoryClient(api_key=MEM0_API_KEY)
-        print(f"Mem0 client initialized successfully")
-    except Exception as e:
-        print(f"Failed to initialize Mem0 client: {e}")
-        mem0 = None
-else:
-    print("Missing Mem0 environment variables")
-    mem0 = None
-'''
-mem0=None
+        memory_backend.add_many(messages, user_ids)
+        outcome = "ok"
+    finally:
+        MEMORY_LATENCY.labels("add", outcome).observe(time.perf_counter() - start)
+
+# Chat turns are persisted to memory in the background, off the request thread
+memory_queue = MemoryWriteQueue(
+    add=add_memories,
+    max_depth=MEMORY_QUEUE_MAX_DEPTH,
+    batch_size=MEMORY_BATCH_SIZE,
+    flush_interval=MEMORY_FLUSH_INTERVAL,
+    max_retries=MEMORY_MAX_RETRIES,
+    retry_backoff=MEMORY_RETRY_BACKOFF,
+    drain_timeout=MEMORY_DRAIN_TIMEOUT,
+    on_write=lambda user_id: invalidate_memories(user_id)
+) if memory_backend else None
+
+SYSTEM_PROMPT = "You are a helpful AI assistant. Use provided context to give personalized responses."
+
+def summarize_conversation(summary, messages):
+    """Folds new messages into a conversation summary with one short LLM call."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    completion = llm_router.create(
+        messages=[
+            {
+                "role": "system",
+                "content": "Update the running summary of a conversation with the new messages. "
+                           "Keep names, facts, preferences and open questions. Reply with the summary only."
+            },
+            {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"}
+        ],
+        max_tokens=PROMPT_SUMMARY_TOKENS
+    )
+    return completion.choices[0].message.content.strip()
+
+# Turns that no longer fit the prompt budget are summarized in the background
+rolling_summaries = RollingSummaries(
+    summarize_conversation,
+    max_conversations=CONVERSATION_MAX_COUNT
+) if PROMPT_SUMMARY_TOKENS > 0 else None
+
+conversation_options = dict(
+    max_messages=CONVERSATION_MAX_MESSAGES,
+    max_chars=CONVERSATION_MAX_CHARS,
+    max_conversations=CONVERSATION_MAX_COUNT,
+    idle_ttl=CONVERSATION_IDLE_TTL,
+    on_drop=lambda room_name, username, messages: (
+        rolling_summaries.fold((room_name, username), messages) if rolling_summaries else None
+    )
+)
+# History is shared by all workers so consecutive turns need not hit the same one
+conversation_store = (
+    SharedConversationStore(CONVERSATION_STORE_PATH, **conversation_options)
+    if CONVERSATION_STORE_PATH else ConversationStore(**conversation_options)
+)
+
 @app.route('/getToken', methods=['POST'])
 def get_token_route():
     """API endpoint to generate and return a LiveKit access token."""
@@ -52,9 +260,33 @@ def get_token_route():
     if not room_name or not identity:
         return jsonify({"error": "roomName and identity are required."}), 400
 
-    token = asyncio.run(generate_token(room_name, identity))
+    token = run_sync(generate_token(room_name, identity))
     return jsonify({"token": token})
 
+def identity_list_error(values, name):
+    """Returns why `values` is not a usable list of identities for a bulk route, or None."""
+    if not isinstance(values, list) or not values:
+        return f"A non-empty {name} list is required."
+    if len(values) > MAX_BULK_TOKENS:
+        return f"At most {MAX_BULK_TOKENS} {name} per request."
+    if not all(isinstance(value, str) and value for value in values):
+        return f"{name} must be non-empty strings."
+    return None
+
+@app.route('/getTokens', methods=['POST'])
+def get_tokens_route():
+    """API endpoint to generate access tokens for many identities in one room."""
+    data = request.get_json()
+    room_name = data.get('roomName')
+    identities = data.get('identities')
+
+    error = "roomName is required." if not room_name else identity_list_error(identities, "identities")
+    if error:
+        return jsonify({"error": error}), 400
+
+    tokens = run_sync(generate_tokens(room_name, identities))
+    return jsonify({"tokens": tokens})
+
 @app.route('/createRoom', methods=['POST'])
 def create_room_route():
     """API endpoint to create a LiveKit room."""
@@ -64,7 +296,7 @@ def create_room_route():
     if not room_name:
         return jsonify({"error": "roomName is required."}), 400
 
-    room_info = asyncio.run(create_room(room_name))
+    room_info = run_sync(create_room(room_name))
     # Convert Room message to dictionary and then to JSON
     room_dict = {
         'name': room_info.name,
@@ -72,11 +304,173 @@ def create_room_route():
     }
     return jsonify(room_dict)
 
+def listing_params(params):
+    """Reads `fields`, `prefix`, `cursor` and `limit` for the listing routes; raises ValueError if invalid.
+
+    Returns the cursor decoded to the name it points past.
+    """
+    fields = params.get('fields')
+    if isinstance(fields, str):
+        fields = [name for name in fields.split(',') if name]
+    if fields is not None and not (isinstance(fields, list) and all(isinstance(name, str) for name in fields)):
+        raise ValueError("fields must be a list or comma-separated string of field names.")
+    limit = params.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValueError("limit must be an integer.") from None
+        if not 1 <= limit <= LISTING_MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {LISTING_MAX_PAGE_SIZE}.")
+    prefix, cursor = params.get('prefix'), params.get('cursor')
+    if not isinstance(prefix or '', str) or not isinstance(cursor or '', str):
+        raise ValueError("prefix and cursor must be strings.")
+    return fields or None, prefix or None, decode_cursor(cursor) if cursor else None, limit
+
 @app.route('/listRooms', methods=['GET'])
+@limiter.limit(LISTING_RATE_LIMIT)
 def list_rooms_route():
-    """API endpoint to list all active rooms."""
-    rooms = asyncio.run(list_rooms())
-    return jsonify({"rooms": rooms})
+    """API endpoint to list active rooms.
+
+    Optional query parameters: `prefix` filters by room name, `limit` and
+    `cursor` page through the rooms in name order, and `fields` (comma-separated)
+    picks the keys returned for each room.
+    """
+    try:
+        fields, prefix, after, limit = listing_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # The name is the sort key, so it is kept until the page is cut
+    rooms = run_sync(list_rooms(fields and list({'name', *fields})))
+    page, next_cursor = paginate(rooms, 'name', prefix, after, limit)
+    if fields and 'name' not in fields:
+        page = [{k: v for k, v in room.items() if k != 'name'} for room in page]
+    return validated_json({"rooms": page, "next_cursor": next_cursor})
+
+# Room and participant listings pushed over SSE; one refresher per listing, however many viewers
+event_hub = EventHub(
+    interval=EVENTS_REFRESH_INTERVAL,
+    history=EVENTS_HISTORY,
+    max_pending=EVENTS_MAX_PENDING,
+    linger=EVENTS_LINGER,
+    max_subscribers=EVENTS_MAX_SUBSCRIBERS
+)
+
+def event_frames(subscription):
+    """Yields a subscription's frames, with a comment line whenever it has been quiet for a heartbeat."""
+    deadline = time.monotonic() + EVENTS_MAX_DURATION
+    try:
+        # Tells EventSource how soon to reconnect once the stream ends
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            frame = subscription.get(timeout=min(EVENTS_HEARTBEAT, deadline - time.monotonic()))
+            yield frame if frame is not None else ": heartbeat\n\n"
+    finally:
+        subscription.close()
+
+@app.route('/events', methods=['GET'])
+@limiter.exempt
+def events_route():
+    """Server-sent events with diffs of the room list, or of one room's participants with `?room=`.
+
+    The stream starts with a `snapshot` event holding the full list, followed by
+    `diff` events with `added`, `updated` and `removed` (names or identities).
+    Every event has an id; a client reconnecting with Last-Event-ID (or
+    `?lastEventId=`) gets only the diffs it missed when they are still known,
+    and a new snapshot otherwise. `fields` projects items as on the listing
+    routes. Streams end after EVENTS_MAX_DURATION seconds and are reopened by
+    the client.
+    """
+    room_name = request.args.get('room')
+    try:
+        fields = listing_params(request.args)[0]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+
+    if room_name:
+        key = 'identity'
+        fields = fields and sorted({key, *fields})
+        topic = f"participants:{room_name}:{','.join(fields or [])}"
+        fetch = lambda: list_participants_or_empty(room_name, fields)
+    else:
+        key = 'name'
+        fields = fields and sorted({key, *fields})
+        topic = f"rooms:{','.join(fields or [])}"
+        fetch = lambda: list_rooms(fields)
+    subscription = event_hub.subscribe(topic, fetch, key, last_event_id)
+    if subscription is None:
+        raise Overloaded("events", "subscribers", max(1, EVENTS_RETRY_MS // 1000))
+
+    return Response(
+        stream_with_context(event_frames(subscription)),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def memory_search_report():
+    with memory_search_stats_lock:
+        searches, errors, total_ms = (memory_search_stats[k] for k in ("searches", "errors", "total_ms"))
+    return {
+        **memory_search_cache.stats(),
+        "searches": searches,
+        "errors": errors,
+        "avg_ms": total_ms / searches if searches else 0.0,
+        "versions": memory_versions.stats(),
+    }
+
+@app.route('/cacheStats', methods=['GET'])
+def cache_stats_route():
+    """API endpoint to report listing cache hit/miss counters."""
+    return jsonify({
+        "listings": listing_cache.stats(),
+        "tokens": token_cache.stats(),
+        "room_state": room_state.stats(),
+        "conversations": conversation_store.stats(),
+        "memory_queue": memory_queue.stats() if memory_queue else None,
+        "memory_search": memory_search_report(),
+        "prompt": {
+            "prompts": prompt_stats["prompts"],
+            "budget": PROMPT_TOKEN_BUDGET,
+            "avg_tokens": {
+                section: total / prompt_stats["prompts"] if prompt_stats["prompts"] else 0.0
+                for section, total in prompt_stats["tokens"].items()
+            },
+            "summaries": rolling_summaries.stats() if rolling_summaries else None,
+        },
+        "chat": {**chat_cache.stats(), **chat_flights.stats()},
+        "llm": llm_router.stats(),
+        "admission": admission.stats(),
+        "compressed": compressor.stats(),
+        "reaper": room_reaper.stats() if ROOM_REAPER_ENABLED else None,
+        "events": event_hub.stats(),
+        "startup": {**startup_stats, "lazy_imports": dict(import_timings)},
+    })
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics_route():
+    """Prometheus scrape endpoint covering every worker process."""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+@app.route('/livekit/webhook', methods=['POST'])
+@limiter.exempt
+def livekit_webhook_route():
+    """Webhook endpoint that ingests LiveKit events into the room state mirror."""
+    body = request.get_data(as_text=True)
+    auth_token = request.headers.get('Authorization', '')
+    if auth_token.startswith('Bearer '):
+        auth_token = auth_token[len('Bearer '):]
+    if not auth_token:
+        return jsonify({"error": "Authorization header is required."}), 401
+
+    try:
+        event = receive_webhook(body, auth_token)
+    except Exception as e:
+        return jsonify({"error": f"Invalid webhook: {e}"}), 401
+    return jsonify({"received": event.event})
 
 @app.route('/deleteRoom', methods=['POST'])
 def delete_room_route():
@@ -86,19 +480,32 @@ def delete_room_route():
     if not room_name:
         return jsonify({"error": "roomName is required."}), 400
 
-    result = asyncio.run(delete_room(room_name))
+    result = run_sync(delete_room(room_name))
     return jsonify(result)
 
 @app.route('/listParticipants', methods=['POST'])
+@limiter.limit(LISTING_RATE_LIMIT)
 def list_participants_route():
-    """API endpoint to list participants in a room."""
+    """API endpoint to list participants in a room.
+
+    Accepts the same optional `prefix` (on identity), `limit`, `cursor` and
+    `fields` as /listRooms in the request body.
+    """
     data = request.get_json()
     room_name = data.get('roomName')
     if not room_name:
         return jsonify({"error": "roomName is required."}), 400
 
-    participants = asyncio.run(list_participants(room_name))
-    return jsonify({"participants": participants})
+    try:
+        fields, prefix, after, limit = listing_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    participants = run_sync(list_participants(room_name, fields and list({'identity', *fields})))
+    page, next_cursor = paginate(participants, 'identity', prefix, after, limit)
+    if fields and 'identity' not in fields:
+        page = [{k: v for k, v in participant.items() if k != 'identity'} for participant in page]
+    return validated_json({"participants": page, "next_cursor": next_cursor})
 
 @app.route('/removeParticipant', methods=['POST'])
 def remove_participant_route():
@@ -109,7 +516,7 @@ def remove_participant_route():
     if not room_name or not identity:
         return jsonify({"error": "roomName and identity are required."}), 400
 
-    result = asyncio.run(remove_participant(room_name, identity))
+    result = run_sync(remove_participant(room_name, identity))
     return jsonify(result)
 
 @app.route('/muteTrack', methods=['POST'])
@@ -124,7 +531,7 @@ def mute_track_route():
     if not all([room_name, identity, track_sid, muted is not None]):
         return jsonify({"error": "roomName, identity, trackSid, and muted are required."}), 400
 
-    result = asyncio.run(mute_track(room_name, identity, track_sid, muted))
+    result = run_sync(mute_track(room_name, identity, track_sid, muted))
     return jsonify(result)
 
 @app.route('/updateParticipant', methods=['POST'])
@@ -139,7 +546,7 @@ def update_participant_route():
     if not all([room_name, identity]):
         return jsonify({"error": "roomName and identity are required."}), 400
 
-    result = asyncio.run(update_participant(room_name, identity, metadata, permissions))
+    result = run_sync(update_participant(room_name, identity, metadata, permissions))
     return jsonify(result)
 
 @app.route('/moveParticipant', methods=['POST'])
@@ -153,9 +560,26 @@ def move_participant_route():
     if not all([room_name, identity, destination_room_name]):
         return jsonify({"error": "roomName, identity, and destinationRoomName are required."}), 400
 
-    result = asyncio.run(move_participant(room_name, identity, destination_room_name))
+    result = run_sync(move_participant(room_name, identity, destination_room_name))
     return jsonify(result)
 
+@app.route('/batch', methods=['POST'])
+def batch_route():
+    """API endpoint to run many room administration operations in one request."""
+    data = request.get_json()
+    operations = data.get('operations')
+    concurrency = data.get('concurrency')
+
+    try:
+        results = run_sync(run_batch(operations, concurrency))
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    failed = sum(1 for r in results if not r["ok"])
+    return jsonify({"results": results, "succeeded": len(results) - failed, "failed": failed})
+
 @app.route('/checkUsername', methods=['POST'])
 def check_username_route():
     """API endpoint to check if username is available in a room."""
@@ -167,34 +591,74 @@ def check_username_route():
         return jsonify({"error": "roomName and username are required."}), 400
     
     try:
-        # Get current participants in the room
-        participants = asyncio.run(list_participants(room_name))
-        
-        # Check if username is already taken
-        for participant in participants:
-            if participant.get('identity') == username:
-                return jsonify({"available": False, "message": "Username is already taken in this room"})
-        
-        return jsonify({"available": True, "message": "Username is available"})
-        
+        result = run_sync(check_identity(room_name, username))
+    except Exception as e:
+        return jsonify({"error": f"Failed to check username: {e}"}), 502
+
+    if result["available"]:
+        message = "Username is available"
+    else:
+        message = "Username is already taken in this room"
+    return jsonify({"available": result["available"], "roomExists": result["room_exists"], "message": message})
+
+@app.route('/checkUsernames', methods=['POST'])
+def check_usernames_route():
+    """API endpoint to check several candidate usernames in a room at once."""
+    data = request.get_json()
+    room_name = data.get('roomName')
+    usernames = data.get('usernames')
+
+    error = "roomName is required." if not room_name else identity_list_error(usernames, "usernames")
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        result = run_sync(check_identities(room_name, usernames))
     except Exception as e:
-        # If room doesn't exist, username is available
-        return jsonify({"available": True, "message": "Username is available"})
+        return jsonify({"error": f"Failed to check usernames: {e}"}), 502
+
+    return jsonify({"available": result["available"], "roomExists": result["room_exists"]})
 
 
 @app.route('/joinRoom', methods=['POST'])
+@admitted("join")
 def join_room_route():
-    """API endpoint to handle user joining a room and AI agent greeting."""
+    """API endpoint to handle user joining a room and AI agent greeting.
+
+    With "mode": "full" the response also carries the access token, the current
+    participants and username availability, fetched concurrently.
+    """
     data = request.get_json()
     room_name = data.get('roomName')
     username = data.get('username')
     
     if not all([room_name, username]):
         return jsonify({"error": "roomName and username are required."}), 400
-    
+
+    if data.get('mode') == 'full':
+        # Single round trip: room, token, roster and availability together
+        try:
+            result = run_sync(join_room(room_name, username), timeout=remaining_time())
+        except TimeoutError:
+            return jsonify({"error": "LiveKit did not answer in time."}), 504
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        return jsonify({
+            "success": True,
+            "greeting": f"Hello! Welcome to {room_name}.",
+            "room": {
+                "name": result["room"]["name"],
+                "sid": result["room"]["sid"]
+            },
+            "token": result["token"],
+            "available": result["available"],
+            "participants": result["participants"],
+            "timings": result["timings"],
+        })
+
     try:
         # Create room if it doesn't exist
-        create_result = asyncio.run(create_room(room_name))
+        create_result = run_sync(create_room(room_name), timeout=remaining_time())
         
         # Check if this user has previous context in this room
         user_room_id = f"{username}_{room_name}"
@@ -234,6 +698,8 @@ def join_room_route():
             }
         })
         
+    except TimeoutError:
+        return jsonify({"error": "LiveKit did not answer in time."}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -364,131 +830,283 @@ def join_room_route():
 #     except Exception as e:
 #         return jsonify({"error": str(e)}), 500
 
-def run_async(coro):
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    if loop.is_running():
-        return asyncio.run(coro)  # fallback
-    return loop.run_until_complete(coro)
-
-# Helper: fetch room + user memories in parallel
+memory_search_cache = TTLCache(maxsize=MEMORY_SEARCH_CACHE_SIZE, ttl=MEMORY_SEARCH_CACHE_TTL, name="memory_search")
+memory_search_stats = {"searches": 0, "errors": 0, "total_ms": 0.0}
+memory_search_stats_lock = threading.Lock()
+# Shared next to the conversations so a write in one worker invalidates cached searches in all of them
+memory_versions = (
+    SharedMemoryVersions(CONVERSATION_STORE_PATH, ttl=MEMORY_SEARCH_CACHE_TTL)
+    if CONVERSATION_STORE_PATH else MemoryVersions(ttl=MEMORY_SEARCH_CACHE_TTL)
+)
+
+def invalidate_memories(user_id):
+    """Makes cached search results for a memory id unreachable after new memories are written."""
+    memory_versions.bump(user_id)
+
+def normalize_query(message):
+    return " ".join(message.lower().split()).strip(" ?!.,")
+
+# Helper: fetch room + user memories in one backend call
 def fetch_memories(message, user_room_id, username):
-    results = []
-    if not mem0:
-        return results
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        query = message
-        futures = [
-            executor.submit(mem0.search, query, version="v2", filters={"AND": [{"user_id": user_room_id}]}, limit=5),
-            executor.submit(mem0.search, query, version="v2", filters={"AND": [{"user_id": username}]}, limit=5)
-        ]
-        for f in futures:
+    """Returns (results, complete); results may be partial or empty when a search failed."""
+    if not memory_backend:
+        return [], True
+
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        results = memory_backend.search_many(message, [user_room_id, username], limit=5)
+    except Exception as e:
+        outcome = "error"
+        print(f"Memory fetch error: {e}")
+        results = e.results if isinstance(e, MemorySearchError) else []
+    elapsed = time.perf_counter() - start
+    with memory_search_stats_lock:
+        memory_search_stats["errors"] += outcome == "error"
+        memory_search_stats["searches"] += 1
+        memory_search_stats["total_ms"] += elapsed * 1000
+    MEMORY_LATENCY.labels("search", outcome).observe(elapsed)
+    return results, outcome == "ok"
+
+def fetch_memory_texts(message, user_room_id, username):
+    """Returns the top relevant memory snippets for a message, served from cache when possible."""
+    if not memory_backend:
+        return []
+    cache_key = (user_room_id, username, *memory_versions.get(user_room_id, username), normalize_query(message))
+    memory_texts = memory_search_cache.get(cache_key)
+    if memory_texts is not None:
+        return memory_texts
+
+    memory_context, complete = fetch_memories(message, user_room_id, username)
+    sorted_memories = sorted(memory_context, key=lambda x: x.get('score', 0), reverse=True)
+    memory_texts = [
+        f"Previous Conversation: {mem['memory']}"
+        for mem in sorted_memories[:3]
+        if mem.get('memory') and mem.get('score', 0) > memory_backend.min_score
+    ]
+    # A failed or partial search is used for this turn only, so one backend blip is not served for the whole TTL
+    if complete:
+        memory_search_cache.set(cache_key, memory_texts)
+    return memory_texts
+
+prompt_stats = {"prompts": 0, "tokens": {"system": 0, "summary": 0, "memories": 0, "history": 0, "message": 0, "total": 0}}
+
+def build_chat_messages(message, chat_messages, memory_texts, room_name, username):
+    """Builds the LLM prompt within PROMPT_TOKEN_BUDGET; returns (messages, section sizes).
+
+    History already covered by the conversation's rolling summary is replaced by
+    the summary, and history that does not fit the budget is folded into it.
+    """
+    summary, covered_seq = "", 0
+    if rolling_summaries:
+        summary, covered_seq = rolling_summaries.get((room_name, username))
+    history = [entry for entry in chat_messages if entry["seq"] > covered_seq]
+    messages, sizes, overflow = assemble_prompt(
+        SYSTEM_PROMPT, message, history, memory_texts,
+        summary=summary,
+        budget=PROMPT_TOKEN_BUDGET,
+        memory_budget=PROMPT_MEMORY_TOKENS
+    )
+    if overflow and rolling_summaries:
+        rolling_summaries.fold((room_name, username), overflow)
+
+    prompt_stats["prompts"] += 1
+    for section in prompt_stats["tokens"]:
+        prompt_stats["tokens"][section] += sizes[section]
+    return messages, sizes
+
+chat_cache = TTLCache(maxsize=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL, name="chat")
+chat_flights = SingleFlight()
+
+def chat_cache_key(message, messages):
+    """Keys a prompt by its normalized message and a hash of everything sent before it."""
+    context = json.dumps(messages[:-1])
+    return normalize_query(message), hashlib.sha256(context.encode()).hexdigest()
+
+def complete_chat(messages, cache_key, timeout=None):
+    """Returns the model's answer from cache, from an identical in-flight request, or from one upstream call.
+
+    `timeout` bounds both the upstream call and the wait for an identical request.
+    """
+    ai_response = chat_cache.get(cache_key)
+    if ai_response is not None:
+        return ai_response
+
+    def call():
+        chat_completion = llm_router.create(messages=messages, timeout=timeout)
+        response = chat_completion.choices[0].message.content
+        chat_cache.set(cache_key, response)
+        return response
+
+    try:
+        return chat_flights.do(cache_key, call, timeout=timeout)
+    except FlightAbandoned:
+        # The request we were waiting on went away without an answer
+        return call()
+
+def save_memories(conversation_history, user_room_id, username):
+    """Queues a finished exchange for room-scoped and user-wide memory; returns immediately."""
+    if not memory_queue:
+        return
+    memory_queue.enqueue(conversation_history, [user_room_id, username])
+
+def sse_event(data, event=None):
+    """Formats a Server-Sent Events frame with a JSON payload."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+def stream_chat_events(messages, message, room_name, username, prompt_sizes, cache_key, timeout=None):
+    """Yields SSE frames for each token the model emits, then a final `done` frame.
+
+    If the client disconnects, the generator is closed and the upstream stream is
+    closed with it, cancelling the completion. Cached answers, and answers shared
+    with an identical in-flight request, arrive as a single token frame.
+    """
+    user_room_id = f"{username}_{room_name}"
+    ai_response = chat_cache.get(cache_key)
+    leader, flight = False, None
+    if ai_response is None:
+        leader, flight = chat_flights.begin(cache_key)
+        if not leader:
             try:
-                res = f.result()
-                if res:
-                    results.extend(res)
-                    print(f"Retrieved {len(res)} memories for {username} in {user_room_id}")
+                ai_response = flight.wait(timeout)
+            except FlightAbandoned:
+                pass  # the leading client went away; stream our own completion
             except Exception as e:
-                print(f"Memory fetch error: {e}")
-    return results
+                yield sse_event({"error": str(e)}, event="error")
+                return
+
+    if ai_response is not None:
+        yield sse_event({"token": ai_response})
+    else:
+        chunks = []
+        completion = None
+        try:
+            completion = llm_router.create(messages=messages, stream=True, timeout=timeout)
+            for chunk in completion:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield sse_event({"token": delta})
+            ai_response = "".join(chunks)
+            chat_cache.set(cache_key, ai_response)
+        except Exception as e:
+            if leader:
+                chat_flights.finish(cache_key, flight, error=e)
+                leader = False
+            yield sse_event({"error": str(e)}, event="error")
+            return
+        finally:
+            if completion is not None:
+                completion.close()
+            if leader:
+                if ai_response is None:
+                    chat_flights.finish(cache_key, flight, error=FlightAbandoned("client disconnected"))
+                else:
+                    chat_flights.finish(cache_key, flight, result=ai_response)
+
+    conversation_history = [
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": ai_response}
+    ]
+    seq = conversation_store.append(room_name, username, *conversation_history)
+    try:
+        yield sse_event({"response": ai_response, "seq": seq, "prompt": prompt_sizes}, event="done")
+    finally:
+        # The answer is complete, so keep it even if the client went away after the last token
+        save_memories(conversation_history, user_room_id, username)
+
+def valid_chat_messages(chat_messages):
+    """Checks client-sent history: a list of {"role": "user" | "assistant", "content": str}."""
+    return isinstance(chat_messages, list) and all(
+        isinstance(entry, dict) and entry.get('role') in ('user', 'assistant') and isinstance(entry.get('content'), str)
+        for entry in chat_messages
+    )
 
 @app.route('/chat', methods=['POST'])
-@limiter.limit("10 per minute")
+@limiter.limit(CHAT_RATE_LIMIT, key_func=identity_key)
+@limiter.limit(CHAT_IP_RATE_LIMIT)
+@admitted("chat", key_func=request_room)
 def chat_route():
-    """Optimized API endpoint for chat messages."""
+    """API endpoint for chat messages.
+
+    With "stream": true the response is a text/event-stream of `{"token": ...}`
+    frames followed by a `done` event carrying the full response.
+
+    History is kept server-side: clients send the `seq` returned by the previous
+    turn instead of `chatMessages`. If the server's copy was evicted or is out of
+    sync it answers 409 with "resync": true, and the client resends once with
+    `chatMessages`, which replaces the stored history.
+
+    Responses carry `prompt`, the token count of each prompt section.
+    """
     data = request.get_json()
     message = data.get('message')
     username = data.get('username')
     room_name = data.get('roomName')
-    chat_messages = data.get('chatMessages', [])
+    chat_messages = data.get('chatMessages')
+    seq = data.get('seq')
 
     if not all([message, username, room_name]):
         return jsonify({"error": "message, username, and roomName are required."}), 400
+    if chat_messages is not None and not valid_chat_messages(chat_messages):
+        return jsonify({"error": "chatMessages must be a list of {role: 'user' or 'assistant', content: string}."}), 400
 
     try:
+        if chat_messages is not None or seq is None:
+            if rolling_summaries:
+                rolling_summaries.reset((room_name, username))
+            history = conversation_store.reset(room_name, username, chat_messages or [])
+        else:
+            history = conversation_store.history(room_name, username, seq)
+            if history is None:
+                return jsonify({"error": "Conversation history is out of sync; resend chatMessages.", "resync": True}), 409
+
         user_room_id = f"{username}_{room_name}"
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a helpful AI assistant. Use provided context to give personalized responses."
-            }
-        ]
-        messages.append({"role": "user", "content": message})
-        #conversation_history = [
-        #    {"role": "user", "content": message},
-        #    #{"role": "assistant", "content": ai_response}
-        #]
-        #chat_completion = groq_client.chat.completions.create(
-        #    messages=messages,
-        #    model="llama-3.1-8b-instant"
-        #)
-        #ai_response = chat_completion.choices[0].message.content
-        #return jsonify({"response": ai_response}), 200
-        return jsonify({"response": " "}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        memory_texts = fetch_memory_texts(message, user_room_id, username)
+        messages, prompt_sizes = build_chat_messages(message, history, memory_texts, room_name, username)
+        cache_key = chat_cache_key(message, messages)
 
-    """
-        try:
-            user_room_id = f"{username}_{room_name}"
-
-            # 1. Fetch memories in parallel
-            memory_context = fetch_memories(message, user_room_id, username)
-
-            # 2. Prepare system + memory messages
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a helpful AI assistant. Use provided context to give personalized responses."
-                }
-            ]
-
-            if memory_context:
-                sorted_memories = sorted(memory_context, key=lambda x: x.get('score', 0), reverse=True)
-                memory_texts = [
-                    f"Previous Conversation: {mem['memory']}"
-                    for mem in sorted_memories[:3]
-                    if mem.get('memory') and mem.get('score', 0) > 0.7
-                ]
-                if memory_texts:
-                    messages.append({
-                        "role": "user",
-                        "content": "Relevant context:\n" + "\n\n".join(memory_texts)
-                    })
-            # 3. Add last 5 turns of chat (10 messages max)
-            recent_messages = chat_messages[-10:]
-            messages.extend(recent_messages)
-            messages.append({"role": "user", "content": message})
-            print(f"Messages: {messages}")  
-
-            # 4. Call Groq
-            chat_completion = groq_client.chat.completions.create(
-                messages=messages,
-                model="llama-3.1-8b-instant"
+        if data.get('stream'):
+            return Response(
+                stream_with_context(stream_chat_events(
+                    messages, message, room_name, username, prompt_sizes, cache_key, remaining_time()
+                )),
+                mimetype='text/event-stream',
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
             )
-            ai_response = chat_completion.choices[0].message.content
-
-            # 5. Save interaction asynchronously
-            conversation_history = [
-                {"role": "user", "content": message},
-                {"role": "assistant", "content": ai_response}
-            ]
-            if mem0:
-                try:
-                    mem0.add(conversation_history, user_id=user_room_id, version="v2")
-                    mem0.add(conversation_history, user_id=username, version="v2")
-                    print(f"✅ Stored memories immediately for {username} in {user_room_id}")
-                except Exception as e:
-                    print(f"❌ Memory storage error: {e}")
-
-            return jsonify({"response": ai_response}), 200
+
+        ai_response = complete_chat(messages, cache_key, timeout=remaining_time())
+        conversation_history = [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": ai_response}
+        ]
+        seq = conversation_store.append(room_name, username, *conversation_history)
+        save_memories(conversation_history, user_room_id, username)
+        return jsonify({"response": ai_response, "seq": seq, "prompt": prompt_sizes}), 200
+    except TimeoutError:
+        return jsonify({"error": "The model did not answer in time."}), 504
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+def warm_up():
+    """Imports the lazily loaded SDKs and builds their clients before the first request.
+
+    Serverless cold starts skip this and pay for each piece on first use;
+    gunicorn runs it in every worker after fork (see gunicorn.conf.py).
     """
+    start = time.perf_counter()
+    warm_imports()
+    run_sync(open_livekit_api())
+    llm_router.warm_up()
+    update_process_metrics(force=True)
+    startup_stats["warm_up_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+# How long importing this module took; heavy SDKs are left out until first use or warm_up()
+startup_stats = {"import_ms": round((time.perf_counter() - _import_started) * 1000, 2), "warm_up_ms": None}
 
 
 if __name__ == '__main__':
@@ -0,0 +1,151 @@
+import math
+import time
+import threading
+from collections import defaultdict
+from app.services.metrics import ADMISSION_SHED
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; reported to the client as a 503 with Retry-After."""
+
+    def __init__(self, route_class: str, reason: str, retry_after: float):
+        super().__init__(f"{route_class} is overloaded ({reason})")
+        self.route_class = route_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """An admitted request; holds its slot until released and carries its deadline."""
+
+    def __init__(self, route_class, key, deadline: float):
+        self.route_class = route_class
+        self.key = key
+        self.deadline = deadline
+        self.admitted_at = time.monotonic()
+        self._released = False
+
+    def remaining(self) -> float:
+        """Seconds left until the request's deadline (never below a small positive floor)."""
+        return max(self.deadline - time.monotonic(), 0.001)
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.route_class.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class RouteClass:
+    """Concurrency limit with a bounded wait queue for one class of routes.
+
+    At most `max_concurrency` requests run at once and at most `max_queue` wait.
+    A request is shed immediately when the queue is full or when the expected
+    wait (queue length times the recent average service time) would exceed
+    `max_wait`, and after `max_wait` seconds if it still has not been admitted.
+    With `max_per_key`, requests sharing a key (e.g. a room) are capped, counting
+    both running and queued ones. Admitted requests get a deadline `deadline`
+    seconds after arrival for their upstream calls.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float,
+                 deadline: float, max_per_key: int = 0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.deadline = deadline
+        self.max_per_key = max_per_key
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = defaultdict(int)
+        self.total_wait = 0.0
+        self.service_time = None
+        self._per_key = defaultdict(int)
+        self._cond = threading.Condition()
+
+    def _expected_wait(self) -> float:
+        if self.service_time is None:
+            return 0.0
+        return (self.waiting + 1) / self.max_concurrency * self.service_time
+
+    def _shed(self, key, reason: str):
+        self.shed[reason] += 1
+        ADMISSION_SHED.labels(self.name, reason).inc()
+        if key is not None:
+            self._drop_key(key)
+        retry_after = max(1, math.ceil(self._expected_wait() or self.max_wait))
+        raise Overloaded(self.name, reason, retry_after)
+
+    def _drop_key(self, key):
+        self._per_key[key] -= 1
+        if self._per_key[key] <= 0:
+            del self._per_key[key]
+
+    def admit(self, key=None) -> Ticket:
+        """Waits for a slot and returns a Ticket, or raises Overloaded."""
+        arrival = time.monotonic()
+        with self._cond:
+            if key is not None:
+                self._per_key[key] += 1
+                if self.max_per_key and self._per_key[key] > self.max_per_key:
+                    self._shed(key, "key_cap")
+            if self.active >= self.max_concurrency or self.waiting:
+                if self.waiting >= self.max_queue:
+                    self._shed(key, "queue_full")
+                if self._expected_wait() > self.max_wait:
+                    self._shed(key, "deadline")
+                self.waiting += 1
+                try:
+                    while self.active >= self.max_concurrency:
+                        remaining = arrival + self.max_wait - time.monotonic()
+                        if remaining <= 0:
+                            self._shed(key, "timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            self.total_wait += time.monotonic() - arrival
+        return Ticket(self, key, arrival + self.deadline)
+
+    def release(self, ticket: Ticket):
+        elapsed = time.monotonic() - ticket.admitted_at
+        with self._cond:
+            self.active -= 1
+            if ticket.key is not None:
+                self._drop_key(ticket.key)
+            # Exponentially weighted average of how long admitted requests hold their slot
+            self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "avg_wait_ms": self.total_wait / self.admitted * 1000 if self.admitted else 0.0,
+                "service_ms": self.service_time * 1000 if self.service_time is not None else None,
+                "keys": len(self._per_key),
+            }
+
+
+class AdmissionController:
+    """Per-process admission control for the route classes that call slow upstreams."""
+
+    def __init__(self, *route_classes: RouteClass):
+        self.route_classes = {route_class.name: route_class for route_class in route_classes}
+
+    def admit(self, name: str, key=None) -> Ticket:
+        return self.route_classes[name].admit(key)
+
+    def stats(self) -> dict:
+        return {name: route_class.stats() for name, route_class in self.route_classes.items()}
@@ -0,0 +1,145 @@
+import os
+import asyncio
+from app.services.livekit_api_service import (
+    list_participants,
+    mute_track,
+    remove_participant,
+    move_participant,
+    update_participant,
+)
+
+# Upper bound on concurrent LiveKit RPCs per batch request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+MAX_BATCH_OPERATIONS = int(os.getenv("MAX_BATCH_OPERATIONS", "200"))
+
+# op name -> (service function, required fields, optional fields), fields named as in the single routes
+OPERATIONS = {
+    "muteTrack": (mute_track, ("roomName", "identity", "trackSid", "muted"), ()),
+    "removeParticipant": (remove_participant, ("roomName", "identity"), ()),
+    "moveParticipant": (move_participant, ("roomName", "identity", "destinationRoomName"), ()),
+    "updateParticipant": (update_participant, ("roomName", "identity"), ("metadata", "permissions")),
+}
+
+TRACK_KINDS = {"audio": "AUDIO", "video": "VIDEO"}
+
+
+class BatchError(ValueError):
+    """Raised when a batch request is malformed; reported to the client as a 400."""
+
+
+def _validate(index: int, op: dict):
+    if not isinstance(op, dict):
+        raise BatchError(f"operation {index} must be an object")
+    name = op.get("op")
+    if name == "muteAll":
+        if not op.get("roomName") or op.get("kind") not in TRACK_KINDS:
+            raise BatchError(f"operation {index}: muteAll requires roomName and kind ('audio' or 'video')")
+        excluded = op.get("except")
+        if excluded is not None and not (
+                isinstance(excluded, list) and all(isinstance(identity, str) for identity in excluded)):
+            raise BatchError(f"operation {index}: except must be a list of identities")
+        return
+    if name not in OPERATIONS:
+        raise BatchError(f"operation {index}: unknown op '{name}'")
+    _, required, _ = OPERATIONS[name]
+    identities = op.get("identities")
+    if identities is not None:
+        if not isinstance(identities, list) or not identities or not all(
+                isinstance(identity, str) and identity for identity in identities):
+            raise BatchError(f"operation {index}: identities must be a non-empty list of non-empty strings")
+    elif "identity" in required and not (isinstance(op.get("identity"), str) and op["identity"]):
+        raise BatchError(f"operation {index}: identity must be a non-empty string")
+    for field in required:
+        if field == "identity" and identities is not None:
+            continue
+        if op.get(field) is None:
+            raise BatchError(f"operation {index}: {name} requires {', '.join(required)}")
+
+
+def _expand(index: int, op: dict) -> list:
+    """Turns an operation carrying an `identities` list into one operation per identity."""
+    identities = op.get("identities")
+    if not isinstance(identities, list):
+        return [(index, op)]
+    return [(index, {**op, "identity": identity}) for identity in identities]
+
+
+async def _expand_mute_all(index: int, op: dict) -> list:
+    """Turns a room-wide mute into one muteTrack operation per matching published track."""
+    track_type = TRACK_KINDS[op["kind"]]
+    muted = op.get("muted", True)
+    excluded = set(op.get("except") or [])
+    expanded = []
+    for participant in await list_participants(op["roomName"]):
+        if participant.get("identity") in excluded:
+            continue
+        for track in participant.get("tracks", []):
+            # AUDIO is the enum default, so it is omitted from the serialized track
+            if track.get("type", "AUDIO") != track_type or track.get("muted", False) == muted:
+                continue
+            expanded.append((index, {
+                "op": "muteTrack",
+                "roomName": op["roomName"],
+                "identity": participant["identity"],
+                "trackSid": track["sid"],
+                "muted": muted,
+            }))
+    return expanded
+
+
+def _failure(index: int, op: dict, error: Exception) -> dict:
+    return {"index": index, "op": op["op"], "identity": op.get("identity"), "error": str(error), "ok": False}
+
+
+async def _run_operation(semaphore: asyncio.Semaphore, index: int, op: dict) -> dict:
+    func, required, optional = OPERATIONS[op["op"]]
+    args = [op[field] for field in required] + [op.get(field) for field in optional]
+    result = {"index": index, "op": op["op"], "identity": op.get("identity")}
+    async with semaphore:
+        try:
+            result["result"] = await func(*args)
+            result["ok"] = True
+        except Exception as e:
+            result = _failure(index, op, e)
+    return result
+
+
+async def run_batch(operations: list, concurrency: int = None) -> list:
+    """Runs room administration operations concurrently, at most `concurrency` at a time.
+
+    Each operation is a dict with an `op` name and the same fields as the matching
+    single route. Per-participant ops accept `identities` in place of `identity`;
+    `muteAll` mutes every audio or video track in a room.
+
+    Returns:
+        list: one result per executed operation, in request order
+    Raises:
+        BatchError: if the request is malformed; nothing is executed in that case
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError("operations must be a non-empty list")
+    # bool is an int subclass, so `true` would otherwise pass as 1
+    if concurrency is not None and (isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1):
+        raise BatchError("concurrency must be a positive integer")
+    for index, op in enumerate(operations):
+        _validate(index, op)
+
+    expanded = []
+    failed = []
+    for index, op in enumerate(operations):
+        if op["op"] != "muteAll":
+            expanded.extend(_expand(index, op))
+            continue
+        try:
+            expanded.extend(await _expand_mute_all(index, op))
+        except Exception as e:
+            # e.g. the room does not exist; reported like any other failed operation
+            failed.append(_failure(index, op, e))
+    if len(expanded) > MAX_BATCH_OPERATIONS:
+        raise BatchError(f"batch expands to {len(expanded)} operations; at most {MAX_BATCH_OPERATIONS} allowed")
+
+    concurrency = min(concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*[_run_operation(semaphore, index, op) for index, op in expanded])
+    # sorted() is stable, so the operations a request expanded into keep their order
+    return sorted(results + failed, key=lambda result: result["index"])
@@ -0,0 +1,173 @@
+import time
+import threading
+from collections import OrderedDict
+from app.services.metrics import CACHE_REQUESTS
+
+
+class TTLCache:
+    """A thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Caches given a `name` also count hits and misses in the cache_requests_total metric.
+
+    `generation` is a clock read before fetching a value; passing it to `set`
+    stores the value only if its key has not been invalidated since. The last
+    `maxsize` invalidations are remembered per key; older ones are folded into
+    a floor below which every generation counts as stale, so the record stays
+    bounded and can only err towards not caching.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 5.0, name: str = None):
+        self.name = name
+        self._hit_metric = CACHE_REQUESTS.labels(name, "hit") if name else None
+        self._miss_metric = CACHE_REQUESTS.labels(name, "miss") if name else None
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._invalidated = OrderedDict()
+        self._floor = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the cached value for `key`, or `default` if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if self._hit_metric:
+                        self._hit_metric.inc()
+                    return value
+                del self._data[key]
+            self.misses += 1
+            if self._miss_metric:
+                self._miss_metric.inc()
+            return default
+
+    def set(self, key, value, ttl: float = None, generation: int = None):
+        """Stores `value` under `key`, evicting the least recently used entry when full.
+
+        If `generation` is given and `key` has been invalidated since it was
+        read, the value is considered stale and not stored.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and (
+                    generation < self._floor or self._invalidated.get(key, 0) > generation):
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *keys):
+        """Drops the given keys from the cache; fetches of them already in flight are not stored."""
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+                self._invalidated.pop(key, None)
+                self._invalidated[key] = self.generation
+            while len(self._invalidated) > self.maxsize:
+                _, generation = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, generation)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._floor = self.generation
+            self._invalidated.clear()
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+class FlightAbandoned(Exception):
+    """Raised to waiters when the leader of a flight went away without a result."""
+
+
+class Flight:
+    """One in-progress computation that concurrent callers can wait on."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout: float = None):
+        """Returns the leader's result, or raises its error (FlightAbandoned if it gave up).
+
+        Raises TimeoutError if the leader has not finished within `timeout` seconds.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError("timed out waiting for the in-flight request")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one computation.
+
+    The first caller for a key becomes the leader (`begin` returns True) and must
+    call `finish` with the result or error; callers arriving meanwhile get the
+    same Flight and wait on it instead of repeating the work.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Returns (is_leader, flight) for `key`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return False, flight
+            flight = Flight()
+            self._flights[key] = flight
+            self.leaders += 1
+            return True, flight
+
+    def finish(self, key, flight: Flight, result=None, error: Exception = None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = result
+        flight.error = error
+        flight._done.set()
+
+    def do(self, key, fn, timeout: float = None):
+        """Runs `fn()` once for all concurrent callers of `key` and returns its result."""
+        leader, flight = self.begin(key)
+        if not leader:
+            return flight.wait(timeout)
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, flight, error=e if isinstance(e, Exception) else FlightAbandoned(str(e)))
+            raise
+        self.finish(key, flight, result=result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
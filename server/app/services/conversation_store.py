@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+# Idle and surplus conversations in the shared store are swept after this many writes
+SWEEP_EVERY = 200
+
+
+class Conversation:
+    """Recent messages of one (room, user) conversation, bounded by count and size."""
+
+    def __init__(self, max_messages: int, max_chars: int):
+        self.messages = deque(maxlen=max_messages)
+        self.max_chars = max_chars
+        self.chars = 0
+        self.seq = 0
+        self.last_used = time.monotonic()
+
+    @classmethod
+    def restore(cls, max_messages: int, max_chars: int, seq: int, messages: list) -> "Conversation":
+        """Rebuilds a conversation from stored messages (already tagged with `seq`)."""
+        conversation = cls(max_messages, max_chars)
+        conversation.messages.extend(messages)
+        conversation.chars = sum(len(message["content"]) for message in messages)
+        conversation.seq = seq
+        return conversation
+
+    def append(self, message: dict) -> list:
+        """Appends a message tagged with its sequence number; returns the messages dropped to make room."""
+        self.seq += 1
+        dropped = []
+        while len(self.messages) >= self.messages.maxlen:
+            dropped.append(self.messages.popleft())
+            self.chars -= len(dropped[-1]["content"])
+        self.messages.append({"role": message["role"], "content": message["content"], "seq": self.seq})
+        self.chars += len(message["content"])
+        while self.chars > self.max_chars and len(self.messages) > 1:
+            dropped.append(self.messages.popleft())
+            self.chars -= len(dropped[-1]["content"])
+        return dropped
+
+
+class ConversationStore:
+    """Server-side chat history so clients only send the new message.
+
+    Each conversation carries a sequence number that advances with every stored
+    message. A client that sends a stale or unknown sequence number must resync
+    by sending its full history once. Idle conversations are evicted first when
+    `max_conversations` is reached, and any conversation idle for longer than
+    `idle_ttl` seconds is dropped. Stored messages carry their sequence number as
+    `seq`; `on_drop(room_name, username, messages)`, if given, receives messages
+    that fall out of a conversation because of the count or size limits.
+    """
+
+    def __init__(self, max_messages: int = 10, max_chars: int = 16000,
+                 max_conversations: int = 1000, idle_ttl: float = 3600.0, on_drop=None):
+        self.on_drop = on_drop
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl
+        self.evictions = 0
+        self.resyncs = 0
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._conversations:
+            key, conversation = next(iter(self._conversations.items()))
+            if len(self._conversations) <= self.max_conversations and conversation.last_used >= cutoff:
+                break
+            del self._conversations[key]
+            self.evictions += 1
+
+    def history(self, room_name: str, username: str, seq: int):
+        """Returns the stored messages if `seq` matches the server's copy, otherwise None."""
+        with self._lock:
+            self._evict()
+            conversation = self._conversations.get((room_name, username))
+            if conversation is None or conversation.seq != seq:
+                return None
+            conversation.last_used = time.monotonic()
+            self._conversations.move_to_end((room_name, username))
+            return list(conversation.messages)
+
+    def reset(self, room_name: str, username: str, messages: list) -> list:
+        """Replaces a conversation with history sent by the client; returns what was kept."""
+        conversation = Conversation(self.max_messages, self.max_chars)
+        dropped = []
+        for message in messages:
+            dropped.extend(conversation.append(message))
+        with self._lock:
+            if (room_name, username) in self._conversations:
+                self.resyncs += 1
+            self._conversations[(room_name, username)] = conversation
+            self._conversations.move_to_end((room_name, username))
+            self._evict()
+            kept = list(conversation.messages)
+        if dropped and self.on_drop:
+            self.on_drop(room_name, username, dropped)
+        return kept
+
+    def append(self, room_name: str, username: str, *messages: dict) -> int:
+        """Appends messages to a conversation and returns its new sequence number."""
+        dropped = []
+        with self._lock:
+            conversation = self._conversations.get((room_name, username))
+            if conversation is None:
+                conversation = Conversation(self.max_messages, self.max_chars)
+                self._conversations[(room_name, username)] = conversation
+            for message in messages:
+                dropped.extend(conversation.append(message))
+            conversation.last_used = time.monotonic()
+            self._conversations.move_to_end((room_name, username))
+            self._evict()
+            seq = conversation.seq
+        if dropped and self.on_drop:
+            self.on_drop(room_name, username, dropped)
+        return seq
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "conversations": len(self._conversations),
+                "chars": sum(c.chars for c in self._conversations.values()),
+                "evictions": self.evictions,
+                "resyncs": self.resyncs,
+            }
+
+
+class SharedConversationStore(ConversationStore):
+    """ConversationStore kept in a local SQLite database in WAL mode, shared by all worker processes.
+
+    Under gunicorn consecutive turns often land on different workers; with an
+    in-process store each of those would miss and force a resync round trip.
+    Every append is one short write transaction, so concurrent turns of the
+    same conversation from different workers are serialized.
+    """
+
+    def __init__(self, path: str, **options):
+        super().__init__(**options)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS conversations "
+            "(room TEXT NOT NULL, username TEXT NOT NULL, seq INTEGER NOT NULL, messages TEXT NOT NULL, "
+            "chars INTEGER NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (room, username))"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are per thread and must not be inherited across fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _load(self, conn, room_name: str, username: str):
+        row = conn.execute(
+            "SELECT seq, messages FROM conversations WHERE room = ? AND username = ? AND last_used >= ?",
+            (room_name, username, time.time() - self.idle_ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        return Conversation.restore(self.max_messages, self.max_chars, row[0], json.loads(row[1]))
+
+    def _save(self, conn, room_name: str, username: str, conversation: Conversation):
+        conn.execute(
+            "INSERT OR REPLACE INTO conversations (room, username, seq, messages, chars, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (room_name, username, conversation.seq, json.dumps(list(conversation.messages)),
+             conversation.chars, time.time())
+        )
+
+    def _sweep(self, conn):
+        self._writes += 1
+        if self._writes % SWEEP_EVERY:
+            return
+        deleted = conn.execute("DELETE FROM conversations WHERE last_used < ?", (time.time() - self.idle_ttl,)).rowcount
+        deleted += conn.execute(
+            "DELETE FROM conversations WHERE rowid IN "
+            "(SELECT rowid FROM conversations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_conversations,)
+        ).rowcount
+        self.evictions += deleted
+
+    def history(self, room_name: str, username: str, seq: int):
+        conn = self._connection()
+        conversation = self._load(conn, room_name, username)
+        if conversation is None or conversation.seq != seq:
+            return None
+        conn.execute("UPDATE conversations SET last_used = ? WHERE room = ? AND username = ?",
+                     (time.time(), room_name, username))
+        return list(conversation.messages)
+
+    def reset(self, room_name: str, username: str, messages: list) -> list:
+        conversation = Conversation(self.max_messages, self.max_chars)
+        dropped = []
+        for message in messages:
+            dropped.extend(conversation.append(message))
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._load(conn, room_name, username) is not None:
+                self.resyncs += 1
+            self._save(conn, room_name, username, conversation)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._sweep(conn)
+        if dropped and self.on_drop:
+            self.on_drop(room_name, username, dropped)
+        return list(conversation.messages)
+
+    def append(self, room_name: str, username: str, *messages: dict) -> int:
+        dropped = []
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so the read and the write are atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conversation = self._load(conn, room_name, username) or Conversation(self.max_messages, self.max_chars)
+            for message in messages:
+                dropped.extend(conversation.append(message))
+            self._save(conn, room_name, username, conversation)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._sweep(conn)
+        if dropped and self.on_drop:
+            self.on_drop(room_name, username, dropped)
+        return conversation.seq
+
+    def stats(self) -> dict:
+        count, chars = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(chars), 0) FROM conversations WHERE last_used >= ?",
+            (time.time() - self.idle_ttl,)
+        ).fetchone()
+        return {
+            "conversations": count,
+            "chars": chars,
+            "evictions": self.evictions,
+            "resyncs": self.resyncs,
+            "shared": True,
+        }
@@ -0,0 +1,81 @@
+import os
+import asyncio
+import atexit
+import threading
+
+# Seconds a sync caller waits on a submitted coroutine before giving up (0 disables)
+ASYNC_CALL_TIMEOUT = float(os.getenv("ASYNC_CALL_TIMEOUT", "30"))
+
+_loop = None
+_loop_thread = None
+_lock = threading.Lock()
+_shutdown_hooks = []
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the process-wide event loop, starting its thread on first use."""
+    global _loop, _loop_thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="async-loop", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+def submit(coro):
+    """Schedules a coroutine on the shared loop and returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro, timeout: float = None):
+    """Runs a coroutine on the shared loop and blocks the calling thread until it completes.
+
+    The coroutine is cancelled if it does not finish within `timeout` seconds
+    (ASYNC_CALL_TIMEOUT by default).
+    """
+    if timeout is None:
+        timeout = ASYNC_CALL_TIMEOUT or None
+    future = submit(coro)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+def on_shutdown(hook):
+    """Registers a coroutine function to be awaited on the loop before it stops."""
+    _shutdown_hooks.append(hook)
+    return hook
+
+
+@atexit.register
+def shutdown():
+    """Runs the shutdown hooks and stops the loop thread."""
+    global _loop, _loop_thread
+    with _lock:
+        loop, thread = _loop, _loop_thread
+        _loop = None
+        _loop_thread = None
+    if loop is None:
+        return
+    for hook in reversed(_shutdown_hooks):
+        try:
+            asyncio.run_coroutine_threadsafe(hook(), loop).result(timeout=5)
+        except Exception as e:
+            print(f"Shutdown hook {hook.__name__} failed: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+def _reset_after_fork():
+    """Drops the parent's loop in a forked child (e.g. gunicorn --preload); threads do not survive fork."""
+    global _loop, _loop_thread, _lock
+    _loop = None
+    _loop_thread = None
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
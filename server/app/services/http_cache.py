@@ -0,0 +1,57 @@
+import gzip
+import hashlib
+from app.services.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional; responses fall back to gzip
+    brotli = None
+
+# Mimetypes worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def content_etag(body: bytes) -> str:
+    """Stable validator for a response body: a short hash of its bytes."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def choose_encoding(accept_encoding) -> str:
+    """Picks brotli or gzip from a parsed Accept-Encoding header, or None for identity."""
+    if brotli is not None and accept_encoding["br"]:
+        return "br"
+    if accept_encoding["gzip"]:
+        return "gzip"
+    return None
+
+
+class Compressor:
+    """Compresses response bodies, keeping recent results by ETag.
+
+    Pollers of the same listing get the same body, so with an ETag each
+    distinct body is compressed once per encoding rather than once per request.
+    """
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5,
+                 cache_size: int = 256, cache_ttl: float = 60):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl, name="compressed")
+
+    def compress(self, body: bytes, encoding: str, etag: str = None) -> bytes:
+        cache_key = (etag, encoding) if etag else None
+        if cache_key is not None:
+            compressed = self._cache.get(cache_key)
+            if compressed is not None:
+                return compressed
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        if cache_key is not None:
+            self._cache.set(cache_key, compressed)
+        return compressed
+
+    def stats(self) -> dict:
+        return self._cache.stats()
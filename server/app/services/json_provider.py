@@ -0,0 +1,38 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; Flask's json-based provider is used without it
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Several times faster than the default provider, which matters for large
+    room and participant listings. Keys are sorted, and datetimes, dates and
+    dataclasses go through Flask's `default` as before (HTTP dates, dicts).
+    The output still differs from the default provider in that:
+
+    - NaN and Infinity become null rather than the non-standard NaN/Infinity
+    - separators are compact and non-ASCII is left unescaped
+    - Enum members, time values and non-string dict keys are serialized
+      instead of raising TypeError
+    - integers beyond 64 bits raise TypeError
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def fast_json_provider(app):
+    """Returns an orjson provider for the app, or None when orjson is not installed."""
+    return OrjsonProvider(app) if orjson is not None else None
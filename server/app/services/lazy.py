@@ -0,0 +1,57 @@
+import time
+import importlib
+import threading
+
+# Module name -> milliseconds its first import took, for modules loaded through lazy_import
+import_timings = {}
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    Keeps heavy SDKs off the import path of a cold start until a request
+    actually needs them. The import runs once under a lock, so concurrent
+    first requests do not see a half-initialised module.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                start = time.perf_counter()
+                module = importlib.import_module(self._name)
+                import_timings[self._name] = round((time.perf_counter() - start) * 1000, 2)
+                self._module = module
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}{'' if self.loaded else ' (not loaded)'}>"
+
+
+_modules = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Returns the shared lazy proxy for a module."""
+    module = _modules.get(name)
+    if module is None:
+        module = _modules.setdefault(name, LazyModule(name))
+    return module
+
+
+def warm_imports() -> dict:
+    """Imports every module registered with lazy_import; returns the import timings."""
+    for module in list(_modules.values()):
+        module._load()
+    return dict(import_timings)
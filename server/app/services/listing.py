@@ -0,0 +1,44 @@
+import base64
+import binascii
+from bisect import bisect_left, bisect_right
+
+
+def encode_cursor(name: str) -> str:
+    """Opaque cursor pointing just past the item with this name."""
+    return base64.urlsafe_b64encode(name.encode()).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """Returns the name a cursor points past; raises ValueError if it is malformed."""
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("invalid cursor") from None
+
+
+def paginate(items: list, key: str, prefix: str = None, after: str = None, limit: int = None):
+    """Returns one page of `items` ordered by `key`, and the cursor of the next page (None on the last).
+
+    Only items whose `key` starts with `prefix` and sorts after `after` (a
+    decoded cursor) are included. Cursors hold the last name returned rather
+    than an offset, so items created or removed between requests do not shift
+    later pages.
+    """
+    ordered = sorted(items, key=lambda item: item.get(key, ''))
+    keys = [item.get(key, '') for item in ordered]
+    start = bisect_right(keys, after) if after is not None else 0
+    if prefix:
+        start = max(start, bisect_left(keys, prefix))
+    end = start
+    while end < len(keys) and (not prefix or keys[end].startswith(prefix)):
+        if limit is not None and end - start == limit:
+            return ordered[start:end], encode_cursor(keys[end - 1])
+        end += 1
+    return ordered[start:end], None
+
+
+def project(items: list, fields) -> list:
+    """Keeps only `fields` of each dict; `None` keeps everything."""
+    if fields is None:
+        return items
+    return [{name: item[name] for name in fields if name in item} for item in items]
@@ -1,148 +1,513 @@
 import os
 import json
-import livekit.api as api
-from livekit.api import (
-    CreateRoomRequest,
-    DeleteRoomRequest,
-    ListRoomsRequest,
-    ListParticipantsRequest,
-    RoomParticipantIdentity,
-    UpdateParticipantRequest,
-    MuteRoomTrackRequest,
-    MoveParticipantRequest,
-    VideoGrants,
-    AccessToken,
-)
+import math
+import base64
+import time
+import asyncio
+import tempfile
+import jwt
+from app.services.lazy import lazy_import
+from app.services.event_loop import on_shutdown
+from app.services.cache import TTLCache
+from app.services.room_state import RoomStateMirror, SharedEventLog
+from app.services.listing import project
+from app.services.metrics import observe_call
+
+# The LiveKit SDK pulls in aiohttp and protobuf; they are imported on the first
+# RoomService call so token-only invocations start without them
+api = lazy_import("livekit.api")
+aiohttp = lazy_import("aiohttp")
+json_format = lazy_import("google.protobuf.json_format")
+type_checkers = lazy_import("google.protobuf.internal.type_checkers")
 
 LIVEKIT_URL = os.getenv("LIVEKIT_URL")
 API_KEY = os.getenv("LIVEKIT_API_KEY")
 API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 
+# Connection pool settings for the shared LiveKit client
+LIVEKIT_POOL_SIZE = int(os.getenv("LIVEKIT_POOL_SIZE", "20"))
+LIVEKIT_KEEPALIVE_TIMEOUT = float(os.getenv("LIVEKIT_KEEPALIVE_TIMEOUT", "30"))
+LIVEKIT_CONNECT_TIMEOUT = float(os.getenv("LIVEKIT_CONNECT_TIMEOUT", "5"))
+LIVEKIT_CALL_TIMEOUT = float(os.getenv("LIVEKIT_CALL_TIMEOUT", "10"))
+
+# Read-through cache for room and participant listings
+LISTING_CACHE_TTL = float(os.getenv("LISTING_CACHE_TTL", "5"))
+LISTING_CACHE_SIZE = int(os.getenv("LISTING_CACHE_SIZE", "1024"))
+
+# Serve listings from the webhook-fed room state mirror when webhooks are configured
+LIVEKIT_WEBHOOK_ENABLED = os.getenv("LIVEKIT_WEBHOOK_ENABLED", "false").lower() == "true"
+ROOM_MIRROR_RESYNC_INTERVAL = float(os.getenv("ROOM_MIRROR_RESYNC_INTERVAL", "60"))
+# A webhook reaches one worker; this SQLite log replays it to every worker's mirror ("" keeps it in-process)
+ROOM_MIRROR_EVENT_LOG = os.getenv(
+    "ROOM_MIRROR_EVENT_LOG", os.path.join(tempfile.gettempdir(), "fluentai-room-events.db")
+)
+
+# Access tokens are reused from the cache while they have at least TOKEN_MIN_VALIDITY seconds left
+TOKEN_TTL = int(os.getenv("TOKEN_TTL", "21600"))
+TOKEN_MIN_VALIDITY = int(os.getenv("TOKEN_MIN_VALIDITY", "3600"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+_lkapi = None
+_lkapi_session = None
+_webhook_receiver = None
+
+room_state = RoomStateMirror(
+    resync_interval=ROOM_MIRROR_RESYNC_INTERVAL,
+    event_log=SharedEventLog(ROOM_MIRROR_EVENT_LOG, retention=5 * ROOM_MIRROR_RESYNC_INTERVAL)
+    if LIVEKIT_WEBHOOK_ENABLED and ROOM_MIRROR_EVENT_LOG else None
+)
+listing_cache = TTLCache(maxsize=LISTING_CACHE_SIZE, ttl=LISTING_CACHE_TTL, name="listings")
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=max(TOKEN_TTL - TOKEN_MIN_VALIDITY, 0), name="tokens")
+ROOMS_CACHE_KEY = ("rooms",)
+
+
+def get_livekit_api() -> "api.LiveKitAPI":
+    """Returns the process-wide LiveKitAPI client, creating it lazily.
+
+    Must be used from the shared loop (see `app.services.event_loop.run_sync`).
+    """
+    global _lkapi, _lkapi_session
+    if _lkapi is None:
+        connector = aiohttp.TCPConnector(
+            limit=LIVEKIT_POOL_SIZE,
+            keepalive_timeout=LIVEKIT_KEEPALIVE_TIMEOUT,
+        )
+        _lkapi_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=LIVEKIT_CALL_TIMEOUT, connect=LIVEKIT_CONNECT_TIMEOUT),
+        )
+        _lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET, session=_lkapi_session)
+    return _lkapi
+
+
+async def open_livekit_api():
+    """Builds the shared client and its pool ahead of the first call; used when pre-warming."""
+    get_livekit_api()
+
+
+@on_shutdown
+async def close_livekit_api():
+    """Closes the shared client and its connection pool."""
+    global _lkapi, _lkapi_session
+    lkapi, session = _lkapi, _lkapi_session
+    _lkapi = None
+    _lkapi_session = None
+    if lkapi is not None:
+        await lkapi.aclose()
+    if session is not None:
+        await session.close()
+
+
+def _reset_after_fork():
+    """Forgets the parent's client in a forked child; its session belongs to the parent's loop."""
+    global _lkapi, _lkapi_session
+    _lkapi = None
+    _lkapi_session = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def invalidate_rooms(*room_names: str):
+    """Drops the cached room list and the participant lists of the given rooms."""
+    listing_cache.invalidate(ROOMS_CACHE_KEY, *[("participants", name) for name in room_names])
+
+
+ROOM_FIELDS = ('sid', 'name', 'empty_timeout', 'creation_time', 'max_participants', 'num_participants')
+
+
+def room_to_dict(room, fields=None) -> dict:
+    """Converts a Room message to the dictionary returned by the listing routes, optionally only `fields`."""
+    return {name: getattr(room, name) for name in (ROOM_FIELDS if fields is None else fields) if name in ROOM_FIELDS}
+
+
+def participant_to_dict(participant, fields=None) -> dict:
+    """Converts a ParticipantInfo message to a dictionary, optionally only the top-level `fields`."""
+    return message_to_dict(participant, fields)
+
+
+def message_to_dict(message, fields=None) -> dict:
+    """Converts a protobuf message straight to a dictionary.
+
+    Produces the same output as `MessageToDict(message, preserving_proto_field_name=True)`
+    (unset fields left out, enums as names, 64-bit integers as strings) without
+    going through JSON, and converts only the top-level `fields` when given.
+    """
+    result = {}
+    for field, value in message.ListFields():
+        if fields is None or field.name in fields:
+            result[field.name] = _field_converter(field)(value)
+    return result
+
+
+# Field full name -> function converting that field's value, built on first use
+_converters = {}
+
+
+def _field_converter(field):
+    converter = _converters.get(field.full_name)
+    if converter is None:
+        converter = _converters[field.full_name] = _make_converter(field)
+    return converter
+
+
+def _make_converter(field):
+    if field.message_type is not None and field.message_type.GetOptions().map_entry:
+        convert_value = _value_converter(field.message_type.fields_by_name['value'])
+        return lambda entries: {str(key): convert_value(value) for key, value in entries.items()}
+    convert = _value_converter(field)
+    if field.is_repeated:
+        return lambda values: [convert(value) for value in values]
+    return convert
+
+
+def _value_converter(field):
+    types = type(field)
+    if field.type == types.TYPE_MESSAGE:
+        if field.message_type.full_name.startswith('google.protobuf.'):
+            # Well-known types have their own JSON forms
+            return lambda value: json_format.MessageToDict(value, preserving_proto_field_name=True)
+        return message_to_dict
+    if field.type == types.TYPE_ENUM:
+        names = {number: value.name for number, value in field.enum_type.values_by_number.items()}
+        return lambda value: names.get(value, value)
+    if field.type in (types.TYPE_INT64, types.TYPE_UINT64, types.TYPE_SINT64, types.TYPE_FIXED64,
+                      types.TYPE_SFIXED64):
+        return str
+    if field.type == types.TYPE_BYTES:
+        return lambda value: base64.b64encode(value).decode('ascii')
+    if field.type in (types.TYPE_FLOAT, types.TYPE_DOUBLE):
+        shortest = type_checkers.ToShortestFloat if field.type == types.TYPE_FLOAT else float
+        return lambda value: shortest(value) if math.isfinite(value) else _NON_FINITE[str(value)]
+    return _identity
+
+
+_NON_FINITE = {'nan': 'NaN', 'inf': 'Infinity', '-inf': '-Infinity'}
+
+
+def _identity(value):
+    return value
+
+
+def receive_webhook(body: str, auth_token: str):
+    """Verifies a LiveKit webhook request and applies its event to the room state mirror.
+
+    Raises an exception if the signature or body hash does not match.
+    """
+    global _webhook_receiver
+    if _webhook_receiver is None:
+        _webhook_receiver = api.WebhookReceiver(api.TokenVerifier(API_KEY, API_SECRET))
+    event = _webhook_receiver.receive(body, auth_token)
+    apply_webhook_event(event)
+    return event
+
+
+def apply_webhook_event(event):
+    """Applies a WebhookEvent to the room state mirror and drops affected cached listings."""
+    room_name = event.room.name
+    created_at = event.created_at
+    if event.event == "room_started":
+        room_state.room_started(room_to_dict(event.room), created_at)
+    elif event.event == "room_finished":
+        room_state.room_finished(room_name, created_at)
+    elif event.event in ("participant_joined", "track_published", "track_unpublished"):
+        room_state.participant_joined(room_name, participant_to_dict(event.participant), created_at)
+    elif event.event in ("participant_left", "participant_connection_aborted"):
+        room_state.participant_left(room_name, event.participant.identity, created_at)
+    else:
+        return
+    invalidate_rooms(room_name)
+
+
+def mint_token(room_name: str, identity: str) -> str:
+    """Returns an access token for a participant, reusing a cached one that is still valid long enough.
+
+    Signed here with PyJWT instead of the SDK's AccessToken so minting does not
+    import livekit.api; the claims are the ones AccessToken produces for these grants.
+    """
+    cache_key = (room_name, identity)
+    token = token_cache.get(cache_key)
+    if token is not None:
+        return token
+    now = int(time.time())
+    claims = {
+        "video": {"roomJoin": True, "room": room_name, "canPublish": True, "canSubscribe": True,
+                  "canPublishData": True},
+        "sip": {"admin": True, "call": True},
+        "sub": identity,
+        "iss": API_KEY,
+        "nbf": now,
+        "exp": now + TOKEN_TTL,
+    }
+    token = jwt.encode(claims, API_SECRET, algorithm="HS256")
+    token_cache.set(cache_key, token)
+    return token
+
+@observe_call
 async def generate_token(room_name: str, identity: str) -> str:
     """Generates an access token for a given participant to join a room."""
-    token = (
-        AccessToken(API_KEY, API_SECRET)
-        .with_identity(identity)
-        .with_grants(VideoGrants(room_join=True, room=room_name))
-        .with_sip_grants(api.SIPGrants(admin=True,call=True))
-        .to_jwt()
-        #.with_name(name)
-    )
-    return token
+    return mint_token(room_name, identity)
+
+@observe_call
+async def generate_tokens(room_name: str, identities: list) -> dict:
+    """Generates access tokens for many participants of a room, keyed by identity."""
+    return {identity: mint_token(room_name, identity) for identity in identities}
 
+@observe_call
 async def create_room(room_name: str):
     """Creates a new room with specified name."""
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
-    try:
-        room_info = await lkapi.room.create_room(CreateRoomRequest(
-            name=room_name,
-            empty_timeout=0,  # 0 means room persists until explicitly deleted
-            max_participants=20
-        ))
-        return room_info
-    finally:
-        await lkapi.aclose()
+    lkapi = get_livekit_api()
+    room_info = await lkapi.room.create_room(api.CreateRoomRequest(
+        name=room_name,
+        empty_timeout=0,  # 0 means room persists until explicitly deleted
+        max_participants=20
+    ))
+    invalidate_rooms(room_name)
+    if LIVEKIT_WEBHOOK_ENABLED:
+        room_state.room_started(room_to_dict(room_info))
+    return room_info
 
-async def list_rooms():
+@observe_call
+async def list_rooms(fields=None):
     """Lists all active rooms.
 
+    Args:
+        fields: room keys to include (default: all of ROOM_FIELDS)
     Returns:
         list: A list of dictionaries containing room information
     """
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
-    try:
-        response = await lkapi.room.list_rooms(ListRoomsRequest())
-        rooms_list = []
-        for room in response.rooms:
-            room_dict = {
-                'sid': room.sid,
-                'name': room.name,
-                'empty_timeout': room.empty_timeout,
-                'creation_time': room.creation_time,
-                'max_participants': room.max_participants,
-                'num_participants': room.num_participants,
-            }
-            rooms_list.append(room_dict)
-        return rooms_list
-    finally:
-        await lkapi.aclose()
+    if LIVEKIT_WEBHOOK_ENABLED:
+        rooms_list = room_state.list_rooms()
+        if rooms_list is not None:
+            return project(rooms_list, fields)
+    generation = listing_cache.generation
+    rooms_list = listing_cache.get(ROOMS_CACHE_KEY)
+    if rooms_list is not None:
+        return project(rooms_list, fields)
+    lkapi = get_livekit_api()
+    response = await lkapi.room.list_rooms(api.ListRoomsRequest())
+    if not listing_cache.ttl and not LIVEKIT_WEBHOOK_ENABLED:
+        return [room_to_dict(room, fields) for room in response.rooms]
+    rooms_list = [room_to_dict(room) for room in response.rooms]
+    listing_cache.set(ROOMS_CACHE_KEY, rooms_list, generation=generation)
+    if LIVEKIT_WEBHOOK_ENABLED:
+        room_state.seed_rooms(rooms_list)
+    return project(rooms_list, fields)
 
+@observe_call
+async def fetch_rooms():
+    """Lists rooms straight from LiveKit, bypassing the mirror, and refreshes the cached listing."""
+    generation = listing_cache.generation
+    lkapi = get_livekit_api()
+    response = await lkapi.room.list_rooms(api.ListRoomsRequest())
+    rooms_list = [room_to_dict(room) for room in response.rooms]
+    listing_cache.set(ROOMS_CACHE_KEY, rooms_list, generation=generation)
+    return rooms_list
+
+@observe_call
 async def delete_room(room_name: str):
     """Deletes a room and disconnects all participants."""
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
-    try:
-        await lkapi.room.delete_room(DeleteRoomRequest(room=room_name))
-        return {"status": "success", "message": f"Room '{room_name}' deleted."}
-    finally:
-        await lkapi.aclose()
+    lkapi = get_livekit_api()
+    await lkapi.room.delete_room(api.DeleteRoomRequest(room=room_name))
+    invalidate_rooms(room_name)
+    room_state.room_finished(room_name)
+    return {"status": "success", "message": f"Room '{room_name}' deleted."}
 
-async def list_participants(room_name: str):
-    """Lists all participants in a given room."""
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
-    try:
-        participants = await lkapi.room.list_participants(ListParticipantsRequest(room=room_name))
-        return [json.loads(p.json()) for p in participants.participants]
-    finally:
-        await lkapi.aclose()
+@observe_call
+async def list_participants(room_name: str, fields=None, fresh: bool = False):
+    """Lists all participants in a given room.
+
+    With `fields`, only those top-level keys of each participant are returned;
+    when nothing is cached, the other fields are not even converted. With
+    `fresh`, the listing cache is not read, for callers that decide on names.
+    """
+    if LIVEKIT_WEBHOOK_ENABLED:
+        participants_list = room_state.list_participants(room_name)
+        if participants_list is not None:
+            return project(participants_list, fields)
+    cache_key = ("participants", room_name)
+    generation = listing_cache.generation
+    participants_list = None if fresh else listing_cache.get(cache_key)
+    if participants_list is not None:
+        return project(participants_list, fields)
+    lkapi = get_livekit_api()
+    participants = await lkapi.room.list_participants(api.ListParticipantsRequest(room=room_name))
+    if not listing_cache.ttl and not LIVEKIT_WEBHOOK_ENABLED:
+        return [participant_to_dict(p, fields) for p in participants.participants]
+    participants_list = [participant_to_dict(p) for p in participants.participants]
+    listing_cache.set(cache_key, participants_list, generation=generation)
+    if LIVEKIT_WEBHOOK_ENABLED:
+        room_state.seed_participants(room_name, participants_list)
+    return project(participants_list, fields)
 
+@observe_call
 async def get_participant(room_name: str, identity: str):
     """Gets details for a specific participant."""
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
+    lkapi = get_livekit_api()
+    participant = await lkapi.room.get_participant(api.RoomParticipantIdentity(room=room_name, identity=identity))
+    return participant_to_dict(participant)
+
+def _is_not_found(error: Exception) -> bool:
+    return isinstance(error, api.TwirpError) and error.code == api.TwirpErrorCode.NOT_FOUND
+
+
+@observe_call
+async def check_identity(room_name: str, identity: str) -> dict:
+    """Checks whether an identity is free in a room without listing every participant.
+
+    Answers from the webhook-fed room state mirror when it is in sync, and
+    otherwise looks up the single identity with GetParticipant. The listing
+    cache is not used: it can be seconds old, and a stale "available" would let
+    two people take the same name.
+
+    Returns:
+        dict: `available`, plus `room_exists` (None when it cannot be told)
+    Raises:
+        Exception: if the LiveKit RPC fails for a reason other than not_found
+    """
+    if LIVEKIT_WEBHOOK_ENABLED:
+        taken = room_state.has_identity(room_name, identity)
+        if taken is not None:
+            return {"available": not taken, "room_exists": True}
+    lkapi = get_livekit_api()
+    try:
+        await lkapi.room.get_participant(api.RoomParticipantIdentity(room=room_name, identity=identity))
+    except Exception as e:
+        if not _is_not_found(e):
+            raise
+        # LiveKit reports both a missing room and a missing participant as not_found
+        return {"available": True, "room_exists": None}
+    return {"available": False, "room_exists": True}
+
+
+@observe_call
+async def check_identities(room_name: str, identities: list) -> dict:
+    """Checks many candidate identities against a single participant listing.
+
+    Like check_identity, it bypasses the listing cache (the in-sync room state
+    mirror still answers).
+
+    Returns:
+        dict: `available` mapping each identity to a bool, and `room_exists`
+    """
+    try:
+        participants = await list_participants(room_name, fresh=True)
+    except Exception as e:
+        if not _is_not_found(e):
+            raise
+        return {"available": {identity: True for identity in identities}, "room_exists": False}
+    taken = {p.get('identity') for p in participants}
+    return {"available": {identity: identity not in taken for identity in identities}, "room_exists": True}
+
+
+@observe_call
+async def ensure_room(room_name: str) -> dict:
+    """Returns the room's info, creating the room unless the in-sync room state mirror has it.
+
+    The listing cache is not consulted: a room deleted since it was cached
+    would not be recreated. CreateRoom returns an existing room unchanged.
+    """
+    rooms = room_state.list_rooms() if LIVEKIT_WEBHOOK_ENABLED else None
+    for room in rooms or []:
+        if room['name'] == room_name:
+            return room
+    return room_to_dict(await create_room(room_name))
+
+
+async def _timed(timings: dict, step: str, coro):
+    start = time.perf_counter()
     try:
-        participant = await lkapi.room.get_participant(RoomParticipantIdentity(room=room_name, identity=identity))
-        return json.loads(participant.json())
+        return await coro
     finally:
-        await lkapi.aclose()
+        timings[step] = round((time.perf_counter() - start) * 1000, 2)
+
+
+async def list_participants_or_empty(room_name: str, fields=None, fresh: bool = False):
+    """Like list_participants, but a room that does not exist has no participants."""
+    try:
+        return await list_participants(room_name, fields, fresh=fresh)
+    except Exception as e:
+        if not _is_not_found(e):
+            raise
+        return []
+
+
+@observe_call
+async def join_room(room_name: str, identity: str) -> dict:
+    """Prepares everything a client needs to join a room in one call.
+
+    Ensures the room exists, mints the access token and fetches the roster
+    concurrently; identity availability is derived from the roster, which
+    bypasses the listing cache for the same reason check_identity does.
+
+    Returns:
+        dict: `room`, `token`, `participants`, `available` and per-step `timings` in ms
+    """
+    timings = {}
+    start = time.perf_counter()
+    room, token, participants = await asyncio.gather(
+        _timed(timings, 'ensure_room', ensure_room(room_name)),
+        _timed(timings, 'token', generate_token(room_name, identity)),
+        _timed(timings, 'participants', list_participants_or_empty(room_name, fresh=True)),
+    )
+    timings['total'] = round((time.perf_counter() - start) * 1000, 2)
+    return {
+        "room": room,
+        "token": token,
+        "participants": participants,
+        "available": all(p.get('identity') != identity for p in participants),
+        "timings": timings,
+    }
 
+
+@observe_call
 async def update_participant(room_name: str, identity: str, metadata: dict = None, permissions: dict = None):
     """Updates a participant's metadata and/or permissions."""
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
-    try:
-        update_request = UpdateParticipantRequest(
-            room=room_name,
-            identity=identity
-        )
-        if metadata:
-            update_request.metadata = json.dumps(metadata)
-        if permissions:
-            update_request.permission = api.ParticipantPermission(**permissions)
-        participant = await lkapi.room.update_participant(update_request)
-        return json.loads(participant.json())
-    finally:
-        await lkapi.aclose()
+    lkapi = get_livekit_api()
+    update_request = api.UpdateParticipantRequest(
+        room=room_name,
+        identity=identity
+    )
+    if metadata:
+        update_request.metadata = json.dumps(metadata)
+    if permissions:
+        update_request.permission = api.ParticipantPermission(**permissions)
+    participant = await lkapi.room.update_participant(update_request)
+    invalidate_rooms(room_name)
+    room_state.participant_joined(room_name, participant_to_dict(participant))
+    return participant_to_dict(participant)
 
+@observe_call
 async def remove_participant(room_name: str, identity: str):
     """Removes a participant from a room."""
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
-    try:
-        await lkapi.room.remove_participant(RoomParticipantIdentity(room=room_name, identity=identity))
-        return {"status": "success", "message": f"Participant '{identity}' removed from room '{room_name}'."}
-    finally:
-        await lkapi.aclose()
+    lkapi = get_livekit_api()
+    await lkapi.room.remove_participant(api.RoomParticipantIdentity(room=room_name, identity=identity))
+    invalidate_rooms(room_name)
+    room_state.participant_left(room_name, identity)
+    return {"status": "success", "message": f"Participant '{identity}' removed from room '{room_name}'."}
 
+@observe_call
 async def mute_track(room_name: str, identity: str, track_sid: str, muted: bool):
     """Mutes or unmutes a participant's track."""
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
-    try:
-        await lkapi.room.mute_published_track(MuteRoomTrackRequest(
-            room=room_name,
-            identity=identity,
-            track_sid=track_sid,
-            muted=muted
-        ))
-        return {"status": "success", "message": f"Track '{track_sid}' for participant '{identity}' muted: {muted}"}
-    finally:
-        await lkapi.aclose()
+    lkapi = get_livekit_api()
+    await lkapi.room.mute_published_track(api.MuteRoomTrackRequest(
+        room=room_name,
+        identity=identity,
+        track_sid=track_sid,
+        muted=muted
+    ))
+    invalidate_rooms(room_name)
+    return {"status": "success", "message": f"Track '{track_sid}' for participant '{identity}' muted: {muted}"}
 
+@observe_call
 async def move_participant(room_name: str, identity: str, destination_room_name: str):
     """Moves a participant to another room."""
-    lkapi = api.LiveKitAPI(LIVEKIT_URL, API_KEY, API_SECRET)
-    try:
-        await lkapi.room.move_participant(MoveParticipantRequest(
-            room=room_name,
-            identity=identity,
-            destination_room=destination_room_name
-        ))
-        return {"status": "success", "message": f"Participant '{identity}' moved from '{room_name}' to '{destination_room_name}'."}
-    finally:
-        await lkapi.aclose()
+    lkapi = get_livekit_api()
+    await lkapi.room.move_participant(api.MoveParticipantRequest(
+        room=room_name,
+        identity=identity,
+        destination_room=destination_room_name
+    ))
+    invalidate_rooms(room_name, destination_room_name)
+    room_state.participant_left(room_name, identity)
+    return {"status": "success", "message": f"Participant '{identity}' moved from '{room_name}' to '{destination_room_name}'."}
@@ -0,0 +1,305 @@
+import os
+import time
+import random
+import threading
+import concurrent.futures
+from collections import deque
+from app.services.metrics import LLM_FIRST_TOKEN, LLM_LATENCY
+
+
+class Provider:
+    """One chat model behind an OpenAI-compatible API.
+
+    `kind` is "groq" (the Groq SDK, which also works against any server exposing
+    /openai/v1/chat/completions at `base_url`) or "litellm" (any model string
+    litellm understands, e.g. "openai/gpt-4o-mini").
+    """
+
+    def __init__(self, name: str, model: str, kind: str = "groq", api_key: str = None,
+                 base_url: str = None, timeout: float = 60.0, max_retries: int = 2, window: int = 100):
+        self.name = name
+        self.model = model
+        self.kind = kind
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.requests = 0
+        self.errors = 0
+        self.last_error_at = None
+        # Streams are timed to their first chunk and plain calls to the full answer, so
+        # they keep separate windows rather than skewing each other's percentiles
+        self._latencies = {False: deque(maxlen=window), True: deque(maxlen=window)}
+        self._outcomes = deque(maxlen=window)
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            if self.kind == "litellm":
+                import litellm
+                self._client = litellm
+            else:
+                from groq import Groq
+                self._client = Groq(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout,
+                                    max_retries=self.max_retries)
+        return self._client
+
+    def create(self, messages: list, stream: bool = False, timeout: float = None, **kwargs):
+        """Calls the model; `timeout` (seconds) overrides the provider's default for this call."""
+        client = self._get_client()
+        timeout = min(timeout, self.timeout) if timeout else self.timeout
+        if self.kind == "litellm":
+            return client.completion(model=self.model, messages=messages, stream=stream, api_key=self.api_key,
+                                     api_base=self.base_url, timeout=timeout, num_retries=self.max_retries,
+                                     **kwargs)
+        return client.chat.completions.create(model=self.model, messages=messages, stream=stream,
+                                              timeout=timeout, **kwargs)
+
+    def record(self, latency_ms: float = None, error: bool = False, stream: bool = False):
+        with self._lock:
+            self.requests += 1
+            self._outcomes.append(error)
+            if error:
+                self.errors += 1
+                self.last_error_at = time.monotonic()
+            else:
+                self._latencies[stream].append(latency_ms)
+
+    def percentile(self, q: float, stream: bool = False):
+        with self._lock:
+            latencies = sorted(self._latencies[stream])
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate(),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "ttft_p50_ms": self.percentile(0.5, stream=True),
+            "ttft_p95_ms": self.percentile(0.95, stream=True),
+        }
+
+
+class RoutedStream:
+    """A streaming completion from the provider that produced the first chunk."""
+
+    def __init__(self, provider: Provider, completion, iterator, first_chunk, started_at: float):
+        self.provider = provider
+        self._completion = completion
+        self._iterator = iterator
+        self._first_chunk = first_chunk
+        self._started_at = started_at
+
+    def __iter__(self):
+        outcome = "error"
+        try:
+            if self._first_chunk is not None:
+                chunk, self._first_chunk = self._first_chunk, None
+                yield chunk
+            yield from self._iterator
+            outcome = "ok"
+        finally:
+            LLM_LATENCY.labels(self.provider.name, "true", outcome).observe(time.perf_counter() - self._started_at)
+
+    def close(self):
+        close = getattr(self._completion, "close", None)
+        if close:
+            close()
+
+
+class LLMRouter:
+    """Routes chat completions to the fastest healthy provider, with optional hedging.
+
+    Each provider keeps a rolling window of outcomes and, per mode, of latencies
+    (time to first chunk for streams, total time otherwise). Requests go to
+    healthy providers in order of their p50 latency for the request's mode
+    (providers without samples first, so they get measured). A provider whose error rate over the
+    window reaches `max_error_rate` is skipped for `cooldown` seconds after its
+    last error, then tried again. If the first attempt has not answered after
+    `hedge_delay` seconds, a duplicate is sent to the next provider (or the same
+    one if it is the only provider) and whichever answers first wins; 0 disables
+    hedging. Failed attempts fall through to the next provider. For streams,
+    "answered" means the first chunk arrived. A per-call `timeout` is one
+    deadline shared by all attempts: hedges and failovers only get the time
+    that is left. A fraction `explore_rate` of
+    requests goes to a random healthy provider first so that the latency of
+    slower-looking providers stays current.
+    """
+
+    def __init__(self, providers: list, hedge_delay: float = 0.0, max_error_rate: float = 0.5,
+                 cooldown: float = 30.0, explore_rate: float = 0.05, max_workers: int = 32):
+        if not providers:
+            raise ValueError("at least one LLM provider is required")
+        self.providers = providers
+        self.hedge_delay = hedge_delay
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.explore_rate = explore_rate
+        self.max_workers = max_workers
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Executor threads do not survive fork, so each worker process builds its own
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="llm-router"
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def healthy(self, provider: Provider) -> bool:
+        if provider.error_rate() < self.max_error_rate or provider.last_error_at is None:
+            return True
+        return time.monotonic() - provider.last_error_at >= self.cooldown
+
+    def ranked(self, stream: bool = False) -> list:
+        """Providers in the order they should be tried; unhealthy ones go last."""
+        order = {id(p): i for i, p in enumerate(self.providers)}
+
+        def key(provider):
+            p50 = provider.percentile(0.5, stream=stream)
+            return (not self.healthy(provider), p50 if p50 is not None else -1, order[id(provider)])
+
+        ranked = sorted(self.providers, key=key)
+        healthy = [p for p in ranked if self.healthy(p)]
+        if len(healthy) > 1 and random.random() < self.explore_rate:
+            chosen = random.choice(healthy[1:])
+            ranked.remove(chosen)
+            ranked.insert(0, chosen)
+        return ranked
+
+    def _attempt(self, provider: Provider, messages: list, stream: bool, kwargs: dict):
+        start = time.perf_counter()
+        try:
+            completion = provider.create(messages, stream=stream, **kwargs)
+            if stream:
+                iterator = iter(completion)
+                completion = RoutedStream(provider, completion, iterator, next(iterator, None), start)
+        except Exception:
+            provider.record(error=True, stream=stream)
+            LLM_LATENCY.labels(provider.name, str(stream).lower(), "error").observe(time.perf_counter() - start)
+            raise
+        elapsed = time.perf_counter() - start
+        provider.record(latency_ms=elapsed * 1000, stream=stream)
+        LLM_FIRST_TOKEN.labels(provider.name, str(stream).lower()).observe(elapsed)
+        if not stream:
+            LLM_LATENCY.labels(provider.name, "false", "ok").observe(elapsed)
+        return completion
+
+    @staticmethod
+    def _discard(future):
+        """Closes the stream of an attempt that lost the race."""
+        if future.exception() is None and isinstance(future.result(), RoutedStream):
+            future.result().close()
+
+    def create(self, messages: list, stream: bool = False, timeout: float = None, **kwargs):
+        """Runs a chat completion; returns the completion, or a RoutedStream when streaming.
+
+        Raises TimeoutError if no attempt has answered within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        candidates = self.ranked(stream)
+        if self.hedge_delay > 0 and len(candidates) == 1:
+            candidates = candidates * 2
+        executor = self._get_executor()
+        pending = {}
+        last_error = None
+        hedged = False
+
+        def remaining():
+            return None if deadline is None else deadline - time.monotonic()
+
+        def launch(is_hedge=False):
+            left = remaining()
+            attempt_kwargs = kwargs if left is None else {**kwargs, "timeout": left}
+            future = executor.submit(self._attempt, candidates.pop(0), messages, stream, attempt_kwargs)
+            pending[future] = is_hedge
+
+        launch()
+        while pending:
+            can_hedge = self.hedge_delay > 0 and not hedged and candidates
+            wait = self.hedge_delay if can_hedge else None
+            left = remaining()
+            if left is not None:
+                if left <= 0:
+                    break
+                wait = left if wait is None else min(wait, left)
+            done, _ = concurrent.futures.wait(pending, timeout=wait, return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                if can_hedge and (left is None or left > self.hedge_delay):
+                    hedged = True
+                    self.hedges += 1
+                    launch(is_hedge=True)
+                continue
+            for future in done:
+                is_hedge = pending.pop(future)
+                try:
+                    completion = future.result()
+                except Exception as e:
+                    last_error = e
+                    left = remaining()
+                    if candidates and (left is None or left > 0):
+                        self.failovers += 1
+                        launch()
+                    continue
+                if is_hedge:
+                    self.hedge_wins += 1
+                for loser in list(pending) + [f for f in done if f is not future]:
+                    loser.add_done_callback(self._discard)
+                return completion
+        if pending:
+            for loser in pending:
+                loser.add_done_callback(self._discard)
+            raise TimeoutError(f"no LLM provider answered within {timeout}s")
+        raise last_error
+
+    def warm_up(self):
+        """Builds every provider's client and the worker threads ahead of the first request."""
+        for provider in self.providers:
+            provider._get_client()
+        self._get_executor()
+
+    def stats(self) -> dict:
+        return {
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {p.name: {**p.stats(), "healthy": self.healthy(p)} for p in self.providers},
+        }
+
+
+def build_providers(specs: list, window: int = 100) -> list:
+    """Creates providers from config dicts with `name`, `model` and optionally `kind`,
+    `base_url`, `timeout`, `max_retries`, and `api_key` or `api_key_env` (the
+    variable holding the key)."""
+    providers = []
+    for spec in specs:
+        # With several providers the router fails over itself, so SDK retries only add latency
+        max_retries = int(spec.get("max_retries", 2 if len(specs) == 1 else 0))
+        api_key = spec.get("api_key") or os.getenv(spec.get("api_key_env", ""))
+        providers.append(Provider(
+            name=spec.get("name") or spec["model"],
+            model=spec["model"],
+            kind=spec.get("kind", "groq"),
+            api_key=api_key,
+            base_url=spec.get("base_url"),
+            timeout=float(spec.get("timeout", 60.0)),
+            max_retries=max_retries,
+            window=window
+        ))
+    return providers
@@ -0,0 +1,273 @@
+import os
+import re
+import json
+import zlib
+import fcntl
+import threading
+from abc import ABC, abstractmethod
+import concurrent.futures
+
+# Only LocalVectorBackend needs numpy; it is imported when that backend is created
+np = None
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("numpy is required for the local memory backend") from None
+        np = numpy
+
+
+class MemorySearchError(Exception):
+    """Raised when some of the searches in `search_many` failed; `results` holds what the others returned."""
+
+    def __init__(self, message: str, results: list):
+        super().__init__(message)
+        self.results = results
+
+
+class MemoryBackend(ABC):
+    """Interface for the stores behind chat memory retrieval and persistence.
+
+    `search` returns dicts with at least `memory` and `score`; results scoring
+    below `min_score` are not used in prompts. Subclasses must implement
+    `search` and `add`; the `_many` variants default to looping over them.
+    """
+
+    min_score = 0.7
+
+    @abstractmethod
+    def search(self, query: str, user_id: str, limit: int = 5) -> list:
+        """Returns the memories of one id that match the query."""
+
+    def search_many(self, query: str, user_ids: list, limit: int = 5) -> list:
+        """Searches several memory ids for the same query and returns the combined results."""
+        results = []
+        for user_id in user_ids:
+            results.extend(self.search(query, user_id, limit))
+        return results
+
+    @abstractmethod
+    def add(self, messages: list, user_id: str):
+        """Stores messages as memories of one id."""
+
+    def add_many(self, messages: list, user_ids: list):
+        """Stores the same messages as memories of several ids."""
+        for user_id in user_ids:
+            self.add(messages, user_id)
+
+
+class Mem0Backend(MemoryBackend):
+    """Hosted Mem0 memory; searches for several ids run in parallel on a shared executor."""
+
+    def __init__(self, api_key: str, search_workers: int = 8):
+        from mem0 import MemoryClient
+        self.client = MemoryClient(api_key=api_key)
+        self.search_workers = search_workers
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Executor threads do not survive fork, so each worker process builds its own
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.search_workers,
+                thread_name_prefix="memory-search"
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def search(self, query: str, user_id: str, limit: int = 5) -> list:
+        return self.client.search(query, version="v2", filters={"AND": [{"user_id": user_id}]}, limit=limit) or []
+
+    def search_many(self, query: str, user_ids: list, limit: int = 5) -> list:
+        executor = self._get_executor()
+        futures = [executor.submit(self.search, query, user_id, limit) for user_id in user_ids]
+        results = []
+        errors = []
+        for f in futures:
+            try:
+                results.extend(f.result())
+            except Exception as e:
+                errors.append(str(e))
+        if errors:
+            raise MemorySearchError("; ".join(errors), results)
+        return results
+
+    def add(self, messages: list, user_id: str):
+        self.client.add(messages, user_id=user_id, version="v2")
+
+    # add_many stays one call per id: a Mem0 memory belongs to exactly one user_id,
+    # and room-scoped searches filter on the combined "<user>_<room>" id
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class LocalVectorBackend(MemoryBackend):
+    """Embedded memory store: a memory-mapped matrix of hashed text embeddings.
+
+    Texts are embedded with signed feature hashing of word unigrams and bigrams,
+    so no model or network is needed. Vectors live in `vectors.f32` (a float32
+    memmap that doubles in capacity when full) and memory texts and owners in
+    `memories.jsonl`, both under `path`. Writers from several worker processes
+    are serialised with a file lock, and each process picks up the others'
+    appends before searching. A search scores every memory of the requested ids
+    with one matrix-vector product and takes the top k with argpartition.
+    """
+
+    min_score = 0.2
+
+    def __init__(self, path: str, dim: int = 512, initial_capacity: int = 1024):
+        _import_numpy()
+        self.path = path
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._texts = []
+        self._owners = []
+        self._owner_codes = {}
+        self._owner_array = np.zeros(0, dtype=np.int32)
+        self._meta_offset = 0
+        self._vectors = None
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "memories.jsonl")
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._lock_path = os.path.join(path, ".lock")
+        self._refresh(initial_capacity)
+
+    def _refresh(self, min_capacity: int = 0):
+        """Picks up memories appended by other worker processes since the last read."""
+        size = os.path.getsize(self._meta_path) if os.path.exists(self._meta_path) else 0
+        if size > self._meta_offset:
+            with open(self._meta_path, "rb") as f:
+                f.seek(self._meta_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written by another process
+                    self._meta_offset += len(line)
+                    entry = json.loads(line)
+                    code = self._owner_codes.setdefault(entry["user_id"], len(self._owner_codes))
+                    self._texts.append(entry["memory"])
+                    self._owners.append(code)
+            self._owner_array = np.array(self._owners, dtype=np.int32)
+        file_rows = os.path.getsize(self._vectors_path) // (4 * self.dim) if os.path.exists(self._vectors_path) else 0
+        capacity = max(min_capacity, len(self._texts), file_rows)
+        if self._vectors is None or self._vectors.shape[0] < capacity:
+            self._open_vectors(capacity)
+
+    def _open_vectors(self, capacity: int):
+        if not os.path.exists(self._vectors_path):
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+            return
+        if os.path.getsize(self._vectors_path) < capacity * self.dim * 4:
+            # Grow the backing file; existing rows keep their offsets
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(capacity * self.dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def embed(self, texts: list):
+        """Returns L2-normalised hashed embeddings, one row per text."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_RE.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode())
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def add(self, messages: list, user_id: str):
+        self.add_many(messages, [user_id])
+
+    def add_many(self, messages: list, user_ids: list):
+        """Embeds the memories once and appends a row per id under a single file lock."""
+        # Store each user turn together with the reply that followed it
+        memories = []
+        pending_user = None
+        for message in messages:
+            if message["role"] == "user":
+                if pending_user:
+                    memories.append(f"User said: {pending_user}")
+                pending_user = message["content"]
+            elif message["role"] == "assistant" and pending_user:
+                memories.append(f"User said: {pending_user}\nAssistant replied: {message['content']}")
+                pending_user = None
+        if pending_user:
+            memories.append(f"User said: {pending_user}")
+        if not memories:
+            return
+
+        vectors = np.tile(self.embed(memories), (len(user_ids), 1))
+        entries = [{"user_id": user_id, "memory": m} for user_id in user_ids for m in memories]
+        with self._lock, open(self._lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            start = len(self._texts)
+            end = start + len(entries)
+            if end > self._vectors.shape[0]:
+                self._vectors.flush()
+                capacity = self._vectors.shape[0]
+                while capacity < end:
+                    capacity *= 2
+                self._open_vectors(capacity)
+            self._vectors[start:end] = vectors
+            self._vectors.flush()
+            # Vectors are written before their metadata lines, so readers never see a row without its vector
+            with open(self._meta_path, "a") as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            self._refresh()
+
+    def search(self, query: str, user_id: str, limit: int = 5) -> list:
+        return self.search_many(query, [user_id], limit)
+
+    def search_many(self, query: str, user_ids: list, limit: int = 5) -> list:
+        with self._lock:
+            self._refresh()
+            wanted = [(user_id, self._owner_codes[user_id]) for user_id in user_ids if user_id in self._owner_codes]
+            if not wanted:
+                return []
+            owners = self._owner_array
+            rows = np.flatnonzero(np.isin(owners, [code for _, code in wanted]))
+            if rows.size == 0:
+                return []
+            scores = self._vectors[rows] @ self.embed([query])[0]
+            row_owners = owners[rows]
+            texts = self._texts
+
+        results = []
+        for user_id, code in wanted:
+            mask = row_owners == code
+            user_rows, user_scores = rows[mask], scores[mask]
+            k = min(limit, user_rows.size)
+            if k == 0:
+                continue
+            top = np.argpartition(-user_scores, k - 1)[:k]
+            top = top[np.argsort(-user_scores[top])]
+            results.extend(
+                {"memory": texts[user_rows[i]], "score": float(user_scores[i]), "user_id": user_id}
+                for i in top
+            )
+        return results
+
+
+def create_memory_backend(kind: str, **options):
+    """Builds the configured memory backend: "mem0", "local", or "none" (memory disabled)."""
+    if kind == "mem0":
+        if not options.get("mem0_api_key"):
+            print("Missing Mem0 environment variables")
+            return None
+        try:
+            backend = Mem0Backend(options["mem0_api_key"], search_workers=options.get("search_workers", 8))
+            print("Mem0 client initialized successfully")
+            return backend
+        except Exception as e:
+            print(f"Failed to initialize Mem0 client: {e}")
+            return None
+    if kind == "local":
+        return LocalVectorBackend(options.get("local_path", "data/memory"), dim=options.get("embed_dim", 512))
+    return None
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+
+
+class MemoryWriteQueue:
+    """Write-behind queue that persists chat turns to the memory backend off the request thread.
+
+    `add` is called as `add(messages, user_ids=[...])`. Turns are collected into
+    batches of up to `batch_size` (or whatever arrived within `flush_interval`
+    seconds); writes for the same user id within a batch are merged, identical
+    writes are deduplicated, and ids left with the same messages (a turn's room
+    id and user id) share one call. Failed writes are retried with
+    exponential backoff. The queue holds at most `max_depth` turns; beyond that
+    new turns are dropped and counted. Pending turns are drained on exit.
+    `on_write(user_id)`, if given, is called after each successful write.
+    """
+
+    def __init__(self, add, max_depth: int = 1000, batch_size: int = 20, flush_interval: float = 1.0,
+                 max_retries: int = 3, retry_backoff: float = 0.5, drain_timeout: float = 10.0,
+                 on_write=None):
+        self.add = add
+        self.on_write = on_write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.drain_timeout = drain_timeout
+        self.enqueued = 0
+        self.dropped = 0
+        self.deduped = 0
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so a forked worker process starts its own
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+                self._worker.start()
+
+    def enqueue(self, messages: list, user_ids: list) -> bool:
+        """Queues one conversation turn for every user id; returns False if the queue is full."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((messages, list(user_ids)))
+        except queue.Full:
+            self.dropped += 1
+            print("Memory write queue full, dropping turn")
+            return False
+        self.enqueued += 1
+        return True
+
+    def _next_batch(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, user_ids: list, messages: list):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.add(messages, user_ids=user_ids)
+                self.written += 1
+                if self.on_write:
+                    for user_id in user_ids:
+                        self.on_write(user_id)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    print(f"❌ Memory storage error for {', '.join(user_ids)}: {e}")
+                    return
+                self.retries += 1
+                time.sleep(self.retry_backoff * (2 ** attempt))
+
+    def flush(self, batch: list):
+        """Writes a batch of queued turns, one call per distinct set of merged messages."""
+        by_user = {}
+        seen = set()
+        for messages, user_ids in batch:
+            key = json.dumps(messages, sort_keys=True)
+            for user_id in user_ids:
+                if (user_id, key) in seen:
+                    self.deduped += 1
+                    continue
+                seen.add((user_id, key))
+                by_user.setdefault(user_id, []).extend(messages)
+        # Usually a turn's room id and user id end up with the same messages and need one write
+        by_messages = {}
+        for user_id, messages in by_user.items():
+            by_messages.setdefault(json.dumps(messages, sort_keys=True), (messages, []))[1].append(user_id)
+        for messages, user_ids in by_messages.values():
+            self._write(user_ids, messages)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self.flush(batch)
+
+    def close(self):
+        """Stops the worker and writes whatever is still queued, bounded by `drain_timeout`."""
+        self._stop.set()
+        if self._worker is not None and self._pid == os.getpid():
+            self._worker.join(timeout=self.flush_interval + 1)
+        deadline = time.monotonic() + self.drain_timeout
+        while time.monotonic() < deadline:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self.flush(batch)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "deduped": self.deduped,
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
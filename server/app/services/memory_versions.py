@@ -0,0 +1,103 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Expired versions are deleted once every this many bumps
+SWEEP_EVERY = 200
+
+
+class MemoryVersions:
+    """Version stamps per memory id, folded into the memory search cache keys.
+
+    `bump(id)` after new memories are written makes every cached search that
+    involved the id unreachable. A version is the time of the id's last bump,
+    so it never repeats, and ids not bumped for `ttl` seconds (the search
+    cache's TTL) are forgotten: every search cached before that bump has
+    expired by then. The mapping therefore stays bounded by the write rate
+    rather than growing with every user and room.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._bumps = 0
+
+    def get(self, *memory_ids) -> tuple:
+        """Returns the current version of each id (0 for ids without a live bump)."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            entries = [self._versions.get(memory_id) for memory_id in memory_ids]
+        return tuple(entry[0] if entry and entry[1] >= cutoff else 0 for entry in entries)
+
+    def bump(self, memory_id):
+        now = time.time()
+        with self._lock:
+            self._versions[memory_id] = (time.time_ns(), now)
+            self._bumps += 1
+            if self._bumps % SWEEP_EVERY == 0:
+                cutoff = now - self.ttl
+                for key in [key for key, entry in self._versions.items() if entry[1] < cutoff]:
+                    del self._versions[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"shared": False, "tracked": len(self._versions), "bumps": self._bumps}
+
+
+class SharedMemoryVersions(MemoryVersions):
+    """MemoryVersions kept in a local SQLite database in WAL mode, shared by all worker processes.
+
+    Memories are written by whichever worker served the turn; with in-process
+    versions the other workers would keep serving their cached searches until
+    the TTL ran out.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        super().__init__(ttl)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS memory_versions "
+            "(memory_id TEXT PRIMARY KEY, version INTEGER NOT NULL, bumped_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are per thread and must not be inherited across fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, *memory_ids) -> tuple:
+        rows = self._connection().execute(
+            f"SELECT memory_id, version FROM memory_versions WHERE bumped_at >= ? "
+            f"AND memory_id IN ({', '.join('?' * len(memory_ids))})",
+            (time.time() - self.ttl, *memory_ids)
+        ).fetchall()
+        versions = dict(rows)
+        return tuple(versions.get(memory_id, 0) for memory_id in memory_ids)
+
+    def bump(self, memory_id):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO memory_versions (memory_id, version, bumped_at) VALUES (?, ?, ?)",
+            (memory_id, time.time_ns(), now)
+        )
+        with self._lock:
+            self._bumps += 1
+            sweep = self._bumps % SWEEP_EVERY == 0
+        if sweep:
+            conn.execute("DELETE FROM memory_versions WHERE bumped_at < ?", (now - self.ttl,))
+
+    def stats(self) -> dict:
+        tracked = self._connection().execute("SELECT COUNT(*) FROM memory_versions").fetchone()[0]
+        with self._lock:
+            return {"shared": True, "tracked": tracked, "bumps": self._bumps}
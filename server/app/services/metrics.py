@@ -0,0 +1,99 @@
+import os
+import time
+import functools
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+# Under multi-worker gunicorn, PROMETHEUS_MULTIPROC_DIR must point at an empty directory
+# before the workers start (gunicorn.conf.py sets it); /metrics then aggregates every worker.
+
+# Chat completions take seconds, so LLM buckets extend further than the RPC ones
+RPC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Flask request latency until the response is returned",
+    ["route", "method", "status"], buckets=RPC_BUCKETS
+)
+LIVEKIT_LATENCY = Histogram(
+    "livekit_call_duration_seconds", "Latency of livekit_api_service calls",
+    ["function", "outcome"], buckets=RPC_BUCKETS
+)
+LLM_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds", "Time until an LLM provider returns the first chunk (or the whole answer)",
+    ["provider", "stream"], buckets=LLM_BUCKETS
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "Total LLM call latency per provider",
+    ["provider", "stream", "outcome"], buckets=LLM_BUCKETS
+)
+MEMORY_LATENCY = Histogram(
+    "memory_operation_duration_seconds", "Memory backend search and add latency",
+    ["operation", "outcome"], buckets=RPC_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"]
+)
+ADMISSION_SHED = Counter(
+    "admission_shed_total", "Requests rejected with 503 by admission control",
+    ["route_class", "reason"]
+)
+ROOMS_REAPED = Counter("rooms_reaped_total", "Idle rooms deleted by the room reaper")
+WORKER_RSS = Gauge("worker_resident_memory_bytes", "Resident set size of the worker process", multiprocess_mode="liveall")
+WORKER_CPU = Gauge("worker_cpu_seconds", "CPU time used by the worker process", multiprocess_mode="liveall")
+
+PROCESS_METRICS_INTERVAL = 5.0
+_process = None
+_process_pid = None
+_process_updated_at = 0.0
+
+
+def observe_call(func):
+    """Records the latency of an async service function in LIVEKIT_LATENCY."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await func(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            LIVEKIT_LATENCY.labels(func.__name__, outcome).observe(time.perf_counter() - start)
+    return wrapper
+
+
+def update_process_metrics(force: bool = False):
+    """Refreshes this worker's CPU and RSS gauges, at most every PROCESS_METRICS_INTERVAL seconds."""
+    global _process, _process_pid, _process_updated_at
+    now = time.monotonic()
+    if not force and now - _process_updated_at < PROCESS_METRICS_INTERVAL and _process_pid == os.getpid():
+        return
+    if _process is None or _process_pid != os.getpid():
+        import psutil
+        _process = psutil.Process()
+        _process_pid = os.getpid()
+    _process_updated_at = now
+    with _process.oneshot():
+        cpu = _process.cpu_times()
+        WORKER_CPU.set(cpu.user + cpu.system)
+        WORKER_RSS.set(_process.memory_info().rss)
+
+
+def render():
+    """Returns (body, content type) for the /metrics endpoint, aggregating all workers when multiprocess."""
+    update_process_metrics(force=True)
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
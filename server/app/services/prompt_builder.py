@@ -0,0 +1,210 @@
+import os
+import re
+import time
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from functools import lru_cache
+
+# Extra tokens a chat message costs on top of its content (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Estimates the token count of a text; results are cached per distinct text.
+
+    Words are counted as one token per four characters (at least one), and each
+    punctuation mark as one token. This is close to the Llama and GPT tokenizers
+    for English chat, with no tokenizer download needed.
+    """
+    return sum((len(piece) + 3) // 4 for piece in _WORD_RE.findall(text))
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Returns the longest prefix of `text` that count_tokens puts at `max_tokens` or fewer."""
+    used = 0
+    end = 0
+    for match in _WORD_RE.finditer(text):
+        used += (len(match.group()) + 3) // 4
+        if used > max_tokens:
+            break
+        end = match.end()
+    return text[:end]
+
+
+class RollingSummaries:
+    """Per-conversation summaries of messages that no longer fit in the prompt.
+
+    Messages are folded in with `fold` and summarized in the background by
+    `summarize(summary, messages)`, which returns the updated summary text. Only
+    the new messages and the previous summary are sent, so each update costs the
+    same whatever the conversation length. Messages are identified by their
+    conversation `seq`; `covered_seq(key)` is the last one included in the
+    summary text, and messages up to it are never folded twice.
+    """
+
+    def __init__(self, summarize, max_conversations: int = 1000, workers: int = 2):
+        self.summarize = summarize
+        self.max_conversations = max_conversations
+        self.workers = workers
+        self.updates = 0
+        self.folded_messages = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Executor threads do not survive fork, so each worker process builds its own
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="prompt-summary"
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def _entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {"text": "", "covered_seq": 0, "queued_seq": 0, "pending": [], "running": False}
+            self._entries[key] = entry
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        """Returns (summary text, covered seq) for a conversation."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return "", 0
+            return entry["text"], entry["covered_seq"]
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def fold(self, key, messages: list):
+        """Queues messages to be merged into the conversation's summary."""
+        with self._lock:
+            entry = self._entry(key)
+            new = [m for m in messages if m["seq"] > entry["queued_seq"]]
+            if not new:
+                return
+            entry["pending"].extend(new)
+            entry["queued_seq"] = new[-1]["seq"]
+            if entry["running"]:
+                return
+            entry["running"] = True
+        self._get_executor().submit(self._run, key, entry)
+
+    def _run(self, key, entry):
+        while True:
+            with self._lock:
+                pending, entry["pending"] = entry["pending"], []
+                if not pending:
+                    entry["running"] = False
+                    return
+                summary = entry["text"]
+            start = time.perf_counter()
+            try:
+                text = self.summarize(summary, pending)
+            except Exception as e:
+                self.errors += 1
+                print(f"Summary update error: {e}")
+                with self._lock:
+                    # Put the messages back so the next fold retries them
+                    entry["pending"][:0] = pending
+                    entry["running"] = False
+                return
+            self.updates += 1
+            self.folded_messages += len(pending)
+            self.total_ms += (time.perf_counter() - start) * 1000
+            with self._lock:
+                entry["text"] = text
+                entry["covered_seq"] = pending[-1]["seq"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            conversations = len(self._entries)
+        return {
+            "conversations": conversations,
+            "updates": self.updates,
+            "folded_messages": self.folded_messages,
+            "errors": self.errors,
+            "avg_ms": self.total_ms / self.updates if self.updates else 0.0,
+        }
+
+
+def assemble_prompt(system_prompt: str, message: str, history: list, memory_texts: list,
+                    summary: str = "", budget: int = 3000, memory_budget: int = 600):
+    """Builds the chat prompt within a token budget.
+
+    The system prompt and the new message are always included. The remaining
+    budget goes to the conversation summary (cut short if it does not fit, since
+    the history it covers is no longer sent), then to memory snippets (at most
+    `memory_budget` tokens including their header), then to as many of the most
+    recent history messages as fit.
+
+    Returns:
+        tuple: (messages, sizes, overflow) where `sizes` holds the token count of
+        each prompt section and `overflow` lists the history messages left out
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    current = {"role": "user", "content": message}
+    sizes = {
+        "system": message_tokens(messages[0]),
+        "message": message_tokens(current),
+        "summary": 0,
+        "memories": 0,
+        "history": 0,
+    }
+    remaining = budget - sizes["system"] - sizes["message"]
+
+    if summary:
+        header = "Summary of the earlier conversation:\n"
+        summary = truncate_to_tokens(summary, remaining - count_tokens(header) - MESSAGE_OVERHEAD_TOKENS)
+        if summary:
+            summary_message = {"role": "system", "content": header + summary}
+            messages.append(summary_message)
+            sizes["summary"] = message_tokens(summary_message)
+            remaining -= sizes["summary"]
+
+    header = "Relevant context:\n"
+    fitted = []
+    used = count_tokens(header) + MESSAGE_OVERHEAD_TOKENS
+    for text in memory_texts:
+        tokens = count_tokens(text) + 1
+        if used + tokens > min(memory_budget, remaining):
+            break
+        fitted.append(text)
+        used += tokens
+    if fitted:
+        memory_message = {"role": "user", "content": header + "\n\n".join(fitted)}
+        messages.append(memory_message)
+        sizes["memories"] = message_tokens(memory_message)
+        remaining -= sizes["memories"]
+
+    # Walk back from the newest message; everything older than the first misfit is left out
+    start = len(history)
+    while start > 0 and message_tokens(history[start - 1]) <= remaining:
+        start -= 1
+        remaining -= message_tokens(history[start])
+        sizes["history"] += message_tokens(history[start])
+    messages.extend({"role": entry["role"], "content": entry["content"]} for entry in history[start:])
+    messages.append(current)
+
+    sizes["history_messages"] = len(history) - start
+    sizes["total"] = sizes["system"] + sizes["message"] + sizes["summary"] + sizes["memories"] + sizes["history"]
+    return messages, sizes, history[:start]
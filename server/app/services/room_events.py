@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from app.services.event_loop import submit, on_shutdown
+
+
+def sse_frame(event: str, data: dict, event_id: str = None) -> str:
+    frame = f"id: {event_id}\n" if event_id else ""
+    return f"{frame}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """One client's bounded queue of encoded frames for a topic.
+
+    If the client falls more than `max_pending` events behind, its queue is
+    dropped and it is sent a fresh snapshot instead, so a slow reader costs at
+    most `max_pending` frames of memory and never holds up the refresher.
+    """
+
+    def __init__(self, topic, max_pending: int):
+        self.topic = topic
+        self.max_pending = max_pending
+        self.last_seq = 0
+        self.needs_snapshot = False
+        self.overflows = 0
+        self._frames = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def offer(self, seq: int, frame: str):
+        """Queues a frame; called on the event loop, never blocks."""
+        with self._cond:
+            if self.needs_snapshot:
+                pass
+            elif len(self._frames) >= self.max_pending:
+                self._frames.clear()
+                self.needs_snapshot = True
+                self.overflows += 1
+            else:
+                self._frames.append((seq, frame))
+            self._cond.notify()
+
+    def get(self, timeout: float):
+        """Returns the next frame, or None if nothing arrived within `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self.needs_snapshot:
+                    snapshot = self.topic.snapshot()
+                    if snapshot is not None:
+                        self.needs_snapshot = False
+                        self._frames.clear()
+                        self.last_seq, frame = snapshot
+                        return frame
+                while self._frames:
+                    seq, frame = self._frames.popleft()
+                    if seq > self.last_seq:
+                        self.last_seq = seq
+                        return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    return None
+                self._cond.wait(remaining)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.topic.unsubscribe(self)
+
+
+class Topic:
+    """A listing kept current by one refresher task and fanned out to every subscriber.
+
+    `fetch` is an async callable returning the full list of item dicts, each
+    identified by `key`. Every `interval` seconds while anyone is subscribed,
+    the refresher fetches once, diffs against the previous list and, if
+    anything changed, encodes one `diff` frame for all subscribers. Recent
+    frames are kept so a reconnecting client can resume from its last event
+    id; otherwise it gets a `snapshot`. The refresher stops after `linger`
+    seconds without subscribers.
+    """
+
+    def __init__(self, name: str, fetch, key: str, hub, interval: float, history: int, linger: float):
+        self.name = name
+        self.fetch = fetch
+        self.key = key
+        self.hub = hub
+        self.interval = interval
+        self.linger = linger
+        # Distinguishes this topic's sequence numbers from a previous instance or another worker
+        self.epoch = os.urandom(4).hex()
+        self.seq = 0
+        self.items = None
+        self.refreshes = 0
+        self.errors = 0
+        self._history = deque(maxlen=history)
+        self._snapshot = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._idle_since = time.monotonic()
+        self._task = None
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def subscribe(self, max_pending: int, last_event_id: str = None) -> Subscription:
+        subscription = Subscription(self, max_pending)
+        with self._lock:
+            epoch, _, seq = (last_event_id or "").partition("-")
+            resume_from = int(seq) if epoch == self.epoch and seq.isdigit() else None
+            # Resumable if nothing was missed or every missed diff is still in the history
+            if resume_from is not None and resume_from <= self.seq and (
+                    resume_from == self.seq or (self._history and self._history[0][0] <= resume_from + 1)):
+                subscription.last_seq = resume_from
+                for seq, frame in self._history:
+                    if seq > resume_from:
+                        subscription.offer(seq, frame)
+            else:
+                subscription.needs_snapshot = True
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers:
+                self._idle_since = time.monotonic()
+
+    def snapshot(self):
+        """Returns (seq, frame) with the full current list, or None before the first fetch."""
+        with self._lock:
+            if self.items is None:
+                return None
+            if self._snapshot is None or self._snapshot[0] != self.seq:
+                frame = sse_frame("snapshot", {"topic": self.name, "seq": self.seq,
+                                               "items": list(self.items.values())}, self.event_id(self.seq))
+                self._snapshot = (self.seq, frame)
+            return self._snapshot
+
+    def _publish(self, items: list):
+        current = {item.get(self.key, ''): item for item in items}
+        with self._lock:
+            previous = self.items
+            self.items = current
+            if previous is None:
+                # First load; subscribers are waiting for a snapshot
+                self.seq += 1
+                subscribers = list(self._subscribers)
+                frame = None
+            else:
+                added = [item for name, item in current.items() if name not in previous]
+                updated = [item for name, item in current.items() if name in previous and previous[name] != item]
+                removed = [name for name in previous if name not in current]
+                if not (added or updated or removed):
+                    return
+                self.seq += 1
+                frame = sse_frame("diff", {"topic": self.name, "seq": self.seq, "added": added,
+                                           "updated": updated, "removed": removed}, self.event_id(self.seq))
+                self._history.append((self.seq, frame))
+                subscribers = list(self._subscribers)
+            seq = self.seq
+        self.hub.events += 1
+        for subscription in subscribers:
+            if frame is None:
+                with subscription._cond:
+                    subscription._cond.notify()
+            else:
+                subscription.offer(seq, frame)
+
+    async def run(self):
+        self._task = asyncio.current_task()
+        while True:
+            with self._lock:
+                idle = not self._subscribers and time.monotonic() - self._idle_since >= self.linger
+            if idle and self.hub.retire(self):
+                return
+            try:
+                self._publish(await self.fetch())
+                self.refreshes += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Event refresh for {self.name} failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "seq": self.seq,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "overflows": sum(s.overflows for s in self._subscribers),
+            }
+
+
+class EventHub:
+    """Per-process registry of listing topics; at most one refresher runs per topic.
+
+    Topics are created on first subscription and retired once they have had no
+    subscribers for `linger` seconds. At most `max_subscribers` streams are
+    served at once; `subscribe` returns None beyond that.
+    """
+
+    def __init__(self, interval: float = 2.0, history: int = 100, max_pending: int = 50,
+                 linger: float = 30.0, max_subscribers: int = 500):
+        self.interval = interval
+        self.history = history
+        self.max_pending = max_pending
+        self.linger = linger
+        self.max_subscribers = max_subscribers
+        self.events = 0
+        self.rejected = 0
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        on_shutdown(self.stop)
+
+    def subscribe(self, name: str, fetch, key: str, last_event_id: str = None):
+        """Subscribes to a topic, starting its refresher if needed; `fetch` is used only when creating it."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Refresher tasks belong to the parent's event loop after a fork
+                self._topics = {}
+                self._pid = os.getpid()
+            if sum(len(topic._subscribers) for topic in self._topics.values()) >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            topic = self._topics.get(name)
+            if topic is None:
+                topic = self._topics[name] = Topic(name, fetch, key, self, self.interval, self.history, self.linger)
+                submit(topic.run())
+            return topic.subscribe(self.max_pending, last_event_id)
+
+    def retire(self, topic: Topic) -> bool:
+        """Removes an idle topic; returns False if someone subscribed in the meantime."""
+        with self._lock:
+            with topic._lock:
+                if topic._subscribers:
+                    return False
+            if self._topics.get(topic.name) is topic:
+                del self._topics[topic.name]
+            return True
+
+    async def stop(self):
+        """Cancels every refresher; awaited on the shared loop at shutdown."""
+        with self._lock:
+            topics = list(self._topics.values()) if self._pid == os.getpid() else []
+            self._topics = {}
+        tasks = [topic._task for topic in topics if topic._task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            topics = {name: topic.stats() for name, topic in self._topics.items()}
+        return {
+            "topics": len(topics),
+            "subscribers": sum(t["subscribers"] for t in topics.values()),
+            "events": self.events,
+            "rejected": self.rejected,
+            "refreshes": sum(t["refreshes"] for t in topics.values()),
+            "by_topic": topics,
+        }
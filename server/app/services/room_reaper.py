@@ -0,0 +1,164 @@
+import os
+import time
+import fcntl
+import asyncio
+import threading
+from fnmatch import fnmatchcase
+from app.services.event_loop import submit, on_shutdown
+from app.services.metrics import ROOMS_REAPED
+
+
+class RoomReaper:
+    """Deletes rooms that have been empty for longer than `idle_timeout` seconds.
+
+    Every `interval` seconds the reaper lists rooms with `list_rooms()` (an async
+    callable returning dicts with `name`, `num_participants` and `creation_time`)
+    and deletes idle ones with `delete_room(name)`, at most `max_concurrent`
+    at a time. A room's idle clock restarts whenever a sweep sees it with
+    participants, and when it is created. Activity is taken only from the
+    listing, which every worker sees alike, so a room only some worker has
+    served is not kept alive by that worker alone. A room first seen empty is
+    timed from that moment, unless `idle_from_creation` is set. Rooms matching one of the
+    `pinned` glob patterns are never deleted.
+
+    With `lock_path`, only the worker process holding an exclusive lock on that
+    file sweeps, so several workers do not race to delete the same rooms.
+    """
+
+    def __init__(self, list_rooms, delete_room, idle_timeout: float = 1800, interval: float = 60,
+                 max_concurrent: int = 4, pinned=(), lock_path: str = None, idle_from_creation: bool = False):
+        self.list_rooms = list_rooms
+        self.delete_room = delete_room
+        self.idle_timeout = idle_timeout
+        self.interval = interval
+        self.max_concurrent = max_concurrent
+        self.pinned = tuple(pinned)
+        self.lock_path = lock_path
+        self.idle_from_creation = idle_from_creation
+        self.sweeps = 0
+        self.reaped = 0
+        self.failed = 0
+        self.last_sweep_at = None
+        self.last_reaped = []
+        self._last_active = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._lock_file = None
+        self._lock_pid = None
+        self._task = None
+        on_shutdown(self.stop)
+
+    def is_pinned(self, room_name: str) -> bool:
+        return any(fnmatchcase(room_name, pattern) for pattern in self.pinned)
+
+    def idle_rooms(self, rooms: list, now: float = None) -> list:
+        """Returns the names of the listed rooms that are empty, unpinned and idle past the timeout."""
+        now = time.time() if now is None else now
+        idle = []
+        with self._lock:
+            listed = set()
+            for room in rooms:
+                name = room['name']
+                listed.add(name)
+                if room.get('num_participants'):
+                    self._last_active[name] = now
+                    continue
+                created_at = room.get('creation_time') or 0
+                first_seen = created_at if self.idle_from_creation and created_at else now
+                last_active = max(self._last_active.setdefault(name, first_seen), created_at)
+                if now - last_active >= self.idle_timeout and not self.is_pinned(name):
+                    idle.append(name)
+            for name in [name for name in self._last_active if name not in listed]:
+                del self._last_active[name]
+        return idle
+
+    async def sweep(self, dry_run: bool = False) -> list:
+        """Lists rooms once and deletes the idle ones; returns the names reaped (or that would be)."""
+        idle = self.idle_rooms(await self.list_rooms())
+        if dry_run:
+            return idle
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        reaped = []
+
+        async def reap(name):
+            async with semaphore:
+                try:
+                    await self.delete_room(name)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Room reaper could not delete '{name}': {e}")
+                    return
+            reaped.append(name)
+            ROOMS_REAPED.inc()
+            with self._lock:
+                self._last_active.pop(name, None)
+
+        await asyncio.gather(*(reap(name) for name in idle))
+        self.sweeps += 1
+        self.reaped += len(reaped)
+        self.last_sweep_at = time.time()
+        self.last_reaped = reaped
+        if reaped:
+            print(f"Room reaper deleted {len(reaped)} idle room(s): {', '.join(reaped)}")
+        return reaped
+
+    def _is_leader(self) -> bool:
+        if self.lock_path is None:
+            return True
+        if self._lock_file is not None and self._lock_pid == os.getpid():
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        # Held for the life of the process; the lock goes away with it
+        self._lock_file = lock_file
+        self._lock_pid = os.getpid()
+        return True
+
+    async def run(self):
+        self._task = asyncio.current_task()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if self._is_leader():
+                    await self.sweep()
+            except Exception as e:
+                print(f"Room reaper sweep failed: {e}")
+
+    def start(self):
+        """Starts the sweep loop on the shared event loop, once per process."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                submit(self.run())
+
+    async def stop(self):
+        """Cancels the sweep loop; awaited on the shared loop at shutdown."""
+        task, self._task = self._task, None
+        if task is not None and self._pid == os.getpid():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            tracked = len(self._last_active)
+        return {
+            "running": self._pid == os.getpid(),
+            "leader": self._lock_file is not None and self._lock_pid == os.getpid(),
+            "idle_timeout": self.idle_timeout,
+            "pinned": list(self.pinned),
+            "tracked": tracked,
+            "sweeps": self.sweeps,
+            "reaped": self.reaped,
+            "failed": self.failed,
+            "last_sweep_at": self.last_sweep_at,
+            "last_reaped": self.last_reaped,
+        }
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# Old log entries are pruned after this many appends
+PRUNE_EVERY = 500
+
+
+class SharedEventLog:
+    """Append-only log of mirror updates in a local SQLite database in WAL mode, shared by all worker processes.
+
+    A LiveKit webhook reaches a single gunicorn worker, so that worker appends
+    the event here and every worker's mirror replays entries it has not seen
+    before answering. Entries older than `retention` seconds are pruned; a
+    mirror that finds it missed pruned entries reseeds from LiveKit.
+    """
+
+    def __init__(self, path: str, retention: float = 300.0):
+        self.path = path
+        self.retention = retention
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._appends = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS events "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, args TEXT NOT NULL, logged_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are per thread and must not be inherited across fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def append(self, kind: str, args: list):
+        conn = self._connection()
+        now = time.time()
+        conn.execute("INSERT INTO events (kind, args, logged_at) VALUES (?, ?, ?)", (kind, json.dumps(args), now))
+        self._appends += 1
+        if self._appends % PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM events WHERE logged_at < ?", (now - self.retention,))
+
+    def last_id(self) -> int:
+        return self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def read_after(self, last_id: int) -> list:
+        """Returns (id, kind, args) for every entry after `last_id`, oldest first."""
+        rows = self._connection().execute(
+            "SELECT id, kind, args FROM events WHERE id > ? ORDER BY id", (last_id,)
+        ).fetchall()
+        return [(event_id, kind, json.loads(args)) for event_id, kind, args in rows]
+
+
+class RoomStateMirror:
+    """In-process mirror of LiveKit rooms and participants, fed by webhook events.
+
+    Listings are indexed by room name and participant identity. A room list or
+    a room's participant list is only served from the mirror once it has been
+    seeded from a LiveKit RPC less than `resync_interval` seconds ago; otherwise
+    the lookup returns None and the caller falls back to the RPC, which reseeds.
+
+    With an `event_log`, updates are appended to it instead of applied directly,
+    and every lookup first replays what other workers appended, so each worker
+    sees the webhooks that only one of them received.
+    """
+
+    def __init__(self, resync_interval: float = 60.0, event_log: SharedEventLog = None):
+        self.resync_interval = resync_interval
+        self.event_log = event_log
+        self.events_applied = 0
+        self.events_ignored = 0
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._log_position = None
+        self._rooms = {}
+        self._participants = {}
+        self._rooms_synced_at = None
+        self._participants_synced_at = {}
+        self._event_at = {}
+
+    def _fresh(self, synced_at) -> bool:
+        return synced_at is not None and time.monotonic() - synced_at < self.resync_interval
+
+    def _is_stale(self, key, created_at: int) -> bool:
+        """Returns True if a newer event for `key` has already been applied."""
+        if not created_at:
+            return False
+        if self._event_at.get(key, 0) > created_at:
+            return True
+        self._event_at[key] = created_at
+        return False
+
+    def _update_count(self, room_name: str):
+        room = self._rooms.get(room_name)
+        if room is not None and room_name in self._participants:
+            room['num_participants'] = len(self._participants[room_name])
+
+    def catch_up(self):
+        """Applies log entries appended since the last call, by this or any other worker."""
+        if self.event_log is None:
+            return
+        with self._log_lock:
+            if self._log_position is None:
+                # Nothing is seeded yet, so earlier entries are already covered by the first RPC
+                self._log_position = self.event_log.last_id()
+                return
+            entries = self.event_log.read_after(self._log_position)
+            if entries and entries[0][0] > self._log_position + 1:
+                # Entries this worker never saw were pruned; serve nothing until reseeded
+                with self._lock:
+                    self._rooms_synced_at = None
+                    self._participants_synced_at.clear()
+            for event_id, kind, args in entries:
+                getattr(self, "_" + kind)(*args)
+                self._log_position = event_id
+
+    def _record(self, kind: str, *args):
+        if self.event_log is None:
+            getattr(self, "_" + kind)(*args)
+            return
+        self.catch_up()
+        self.event_log.append(kind, list(args))
+        self.catch_up()
+
+    def seed_rooms(self, rooms: list):
+        """Replaces the room index with a full listing from LiveKit."""
+        self.catch_up()
+        with self._lock:
+            self._rooms = {room['name']: dict(room) for room in rooms}
+            for name in list(self._participants):
+                if name not in self._rooms:
+                    del self._participants[name]
+                    self._participants_synced_at.pop(name, None)
+            self._rooms_synced_at = time.monotonic()
+
+    def seed_participants(self, room_name: str, participants: list):
+        """Replaces a room's participant index with a full listing from LiveKit."""
+        self.catch_up()
+        with self._lock:
+            self._participants[room_name] = {p['identity']: p for p in participants}
+            self._participants_synced_at[room_name] = time.monotonic()
+            self._update_count(room_name)
+
+    def list_rooms(self):
+        """Returns the mirrored room list, or None if it must be fetched from LiveKit."""
+        self.catch_up()
+        with self._lock:
+            if not self._fresh(self._rooms_synced_at):
+                return None
+            return [dict(room) for room in self._rooms.values()]
+
+    def list_participants(self, room_name: str):
+        """Returns the mirrored participants of a room, or None if they must be fetched."""
+        self.catch_up()
+        with self._lock:
+            if not self._fresh(self._participants_synced_at.get(room_name)):
+                return None
+            return list(self._participants.get(room_name, {}).values())
+
+    def has_identity(self, room_name: str, identity: str):
+        """Returns whether `identity` is in the room, or None if the mirror cannot tell."""
+        self.catch_up()
+        with self._lock:
+            if not self._fresh(self._participants_synced_at.get(room_name)):
+                return None
+            return identity in self._participants.get(room_name, {})
+
+    def room_started(self, room: dict, created_at: int = 0):
+        self._record("room_started", room, created_at)
+
+    def room_finished(self, room_name: str, created_at: int = 0):
+        self._record("room_finished", room_name, created_at)
+
+    def participant_joined(self, room_name: str, participant: dict, created_at: int = 0):
+        """Adds or replaces a participant; also used for track and metadata updates."""
+        self._record("participant_joined", room_name, participant, created_at)
+
+    def participant_left(self, room_name: str, identity: str, created_at: int = 0):
+        self._record("participant_left", room_name, identity, created_at)
+
+    def _room_started(self, room: dict, created_at: int = 0):
+        with self._lock:
+            if self._is_stale((room['name'],), created_at):
+                self.events_ignored += 1
+                return
+            self._rooms[room['name']] = dict(room)
+            # A freshly started room is known to be empty
+            self._participants.setdefault(room['name'], {})
+            self._participants_synced_at[room['name']] = time.monotonic()
+            self._update_count(room['name'])
+            self.events_applied += 1
+
+    def _room_finished(self, room_name: str, created_at: int = 0):
+        with self._lock:
+            if self._is_stale((room_name,), created_at):
+                self.events_ignored += 1
+                return
+            self._rooms.pop(room_name, None)
+            self._participants.pop(room_name, None)
+            self._participants_synced_at.pop(room_name, None)
+            for key in [k for k in self._event_at if k[0] == room_name and len(k) > 1]:
+                del self._event_at[key]
+            self.events_applied += 1
+
+    def _participant_joined(self, room_name: str, participant: dict, created_at: int = 0):
+        with self._lock:
+            if self._is_stale((room_name, participant['identity']), created_at):
+                self.events_ignored += 1
+                return
+            self._participants.setdefault(room_name, {})[participant['identity']] = participant
+            self._update_count(room_name)
+            self.events_applied += 1
+
+    def _participant_left(self, room_name: str, identity: str, created_at: int = 0):
+        with self._lock:
+            if self._is_stale((room_name, identity), created_at):
+                self.events_ignored += 1
+                return
+            self._participants.get(room_name, {}).pop(identity, None)
+            self._update_count(room_name)
+            self.events_applied += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rooms": len(self._rooms),
+                "participants": sum(len(p) for p in self._participants.values()),
+                "rooms_synced": self._fresh(self._rooms_synced_at),
+                "events_applied": self.events_applied,
+                "events_ignored": self.events_ignored,
+                "shared": self.event_log is not None,
+                "log_position": self._log_position,
+            }
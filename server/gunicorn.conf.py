@@ -0,0 +1,43 @@
+# gunicorn.conf.py -- picked up automatically when gunicorn runs from this directory
+import os
+import shutil
+import tempfile
+
+# Workers write Prometheus samples here so /metrics can aggregate all of them.
+# This has to be set before any worker imports prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "fluentai-prometheus"))
+
+# /events streams hold a thread for minutes at a time; on sync workers a handful of
+# viewers would block every other route, so serve requests from a thread pool.
+# The app reads GUNICORN_THREADS too: unless EVENTS_MAX_SUBSCRIBERS is set, each worker
+# accepts at most GUNICORN_THREADS - EVENTS_RESERVED_THREADS (default 8) streams and
+# answers the rest with 503, so that many threads always stay free for /getToken,
+# /joinRoom and /chat. Set threads through GUNICORN_THREADS rather than --threads, or
+# set EVENTS_MAX_SUBSCRIBERS to match.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be counted again
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # Long-running workers import the lazily loaded SDKs and open their clients up front,
+    # so the first requests do not pay for it. Set STARTUP_PREWARM=false to skip.
+    if os.getenv("STARTUP_PREWARM", "true").lower() != "true":
+        return
+    try:
+        from app.main import warm_up, startup_stats
+        warm_up()
+        print(f"Worker {worker.pid} warmed up in {startup_stats['warm_up_ms']} ms")
+    except Exception as e:
+        print(f"Worker {worker.pid} warm-up failed: {e}")
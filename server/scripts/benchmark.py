@@ -0,0 +1,266 @@
+"""Benchmarks the server's endpoints against local fake LiveKit and LLM servers.
+
+Starts scripts/fake_livekit_server.py and scripts/fake_llm_server.py on free
+ports, imports the Flask app configured to use them, and drives each endpoint
+through the WSGI test client from `--concurrency` threads. Network noise
+between the benchmark and the app is left out, so runs on the same machine
+are comparable across commits. For each endpoint it reports throughput,
+p50/p90/p99 latency, and a separate sequential pass under tracemalloc that
+measures the peak Python memory allocated while serving requests and what is
+still retained afterwards.
+
+Usage:
+    python scripts/benchmark.py --requests 500 --concurrency 8 --output benchmarks/baseline.json
+    python scripts/benchmark.py --endpoints chat,listRooms --compare benchmarks/baseline.json
+
+Extra server settings can be passed as --env KEY=VALUE (e.g. --env LISTING_CACHE_TTL=0).
+Exits with status 1 when --compare and --max-regression are given and an
+endpoint's p99 latency or throughput regressed by more than that percentage.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import threading
+import subprocess
+import tracemalloc
+import concurrent.futures
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(SERVER_DIR, "scripts")
+
+
+def endpoint_specs(rooms: int, participants: int) -> dict:
+    """Endpoint name -> function of the request index returning (method, path, json body)."""
+    return {
+        "getToken": lambda i: ("POST", "/getToken", {"roomName": "bench-0", "identity": f"bench-user-{i}"}),
+        "getTokens": lambda i: ("POST", "/getTokens", {
+            "roomName": "bench-0", "identities": [f"bench-user-{i}-{k}" for k in range(20)]
+        }),
+        "listRooms": lambda i: ("GET", "/listRooms", None),
+        "listParticipants": lambda i: ("POST", "/listParticipants", {"roomName": f"bench-{i % rooms}"}),
+        "checkUsername": lambda i: ("POST", "/checkUsername", {
+            "roomName": f"bench-{i % rooms}", "username": f"user-{i % (participants * 2)}"
+        }),
+        "joinRoom": lambda i: ("POST", "/joinRoom", {
+            "roomName": f"bench-{i % rooms}", "username": f"joiner-{i}", "mode": "full"
+        }),
+        "muteTrack": lambda i: ("POST", "/muteTrack", {
+            "roomName": "bench-0", "identity": "user-0", "trackSid": "TR_A_0_0", "muted": i % 2 == 0
+        }),
+        "batch": lambda i: ("POST", "/batch", {
+            "operations": [{"op": "muteAll", "roomName": f"bench-{i % rooms}", "kind": "audio", "muted": i % 2 == 0}]
+        }),
+        "chat": lambda i: ("POST", "/chat", {
+            "message": f"benchmark question {i}", "username": f"bench-user-{i % 50}", "roomName": f"bench-{i % rooms}"
+        }),
+        "chatStream": lambda i: ("POST", "/chat", {
+            "message": f"benchmark question {i}", "username": f"bench-user-{i % 50}", "roomName": f"bench-{i % rooms}",
+            "stream": True
+        }),
+        "cacheStats": lambda i: ("GET", "/cacheStats", None),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(script: str, port: int, *args) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, script), "--port", str(port), *map(str, args)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{script} did not start on port {port}")
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def make_request(app, local, spec, i):
+    client = getattr(local, "client", None)
+    if client is None:
+        client = local.client = app.test_client()
+    method, path, body = spec(i)
+    start = time.perf_counter()
+    # Closing the response runs its close callbacks, which release admission tickets of streamed routes
+    with client.open(path, method=method, json=body) as response:
+        response.get_data()  # drain streamed bodies
+        return time.perf_counter() - start, response.status_code < 400
+
+
+def run_endpoint(app, spec, requests: int, concurrency: int, offset: int) -> dict:
+    local = threading.local()
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, ok in executor.map(lambda i: make_request(app, local, spec, offset + i), range(requests)):
+            latencies.append(latency)
+            errors += 0 if ok else 1
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+
+def measure_allocations(app, spec, requests: int, offset: int) -> dict:
+    """Serves requests one at a time under tracemalloc; reports peak and retained bytes."""
+    local = threading.local()
+    make_request(app, local, spec, offset)  # create the client outside the measurement
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for i in range(1, requests + 1):
+        make_request(app, local, spec, offset + i)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "alloc_peak_kib": round((peak - baseline) / 1024, 1),
+        "retained_bytes_per_request": round((current - baseline) / requests, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, max_regression: float = None) -> bool:
+    """Prints per-endpoint changes against a baseline; returns False if a regression exceeds the limit."""
+    ok = True
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    print(f"{'endpoint':<18}{'rps':>12}{'Δ rps':>9}{'p50 ms':>10}{'Δ p50':>9}{'p99 ms':>10}{'Δ p99':>9}")
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<18}{current['throughput_rps']:>12}{'new':>9}")
+            continue
+
+        def change(key):
+            return (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+
+        rps, p50, p99 = change("throughput_rps"), change("p50_ms"), change("p99_ms")
+        print(f"{name:<18}{current['throughput_rps']:>12}{rps:>+8.1f}%{current['p50_ms']:>10}{p50:>+8.1f}%"
+              f"{current['p99_ms']:>10}{p99:>+8.1f}%")
+        if max_regression is not None and (p99 > max_regression or -rps > max_regression):
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", help="comma-separated endpoint names (default: all)")
+    parser.add_argument("--requests", type=int, default=300, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per endpoint")
+    parser.add_argument("--alloc-requests", type=int, default=50, help="requests in the allocation pass (0 skips it)")
+    parser.add_argument("--livekit-latency", type=float, default=5, help="fake LiveKit latency in ms")
+    parser.add_argument("--llm-latency", type=float, default=50, help="fake LLM time to first token in ms")
+    parser.add_argument("--llm-token-delay", type=float, default=1, help="fake LLM delay between streamed words in ms")
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server setting")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, help="allowed p99/throughput regression in percent")
+    args = parser.parse_args()
+
+    specs = endpoint_specs(args.rooms, args.participants)
+    names = args.endpoints.split(",") if args.endpoints else list(specs)
+    unknown = [name for name in names if name not in specs]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}; choose from {', '.join(specs)}")
+
+    livekit_port, llm_port = free_port(), free_port()
+    servers = [
+        start_server("fake_livekit_server.py", livekit_port, "--latency", args.livekit_latency,
+                     "--rooms", args.rooms, "--participants", args.participants),
+        start_server("fake_llm_server.py", llm_port, "--latency", args.llm_latency,
+                     "--token-delay", args.llm_token_delay),
+    ]
+    try:
+        os.environ.update({
+            "LIVEKIT_URL": f"http://127.0.0.1:{livekit_port}",
+            "LIVEKIT_API_KEY": "bench-key",
+            "LIVEKIT_API_SECRET": "bench-secret-bench-secret-bench-secret",
+            "GROQ_API_KEY": "bench",
+            "GROQ_BASE_URL": f"http://127.0.0.1:{llm_port}",
+            "LLM_PROVIDERS": "",
+        })
+        os.environ.update(dict(item.split("=", 1) for item in args.env))
+        sys.path.insert(0, SERVER_DIR)
+        from app.main import app, limiter
+        limiter.enabled = False
+
+        results = {}
+        offset = 0
+        for name in names:
+            spec = specs[name]
+            for i in range(args.warmup):
+                make_request(app, threading.local(), spec, offset + i)
+            offset += args.warmup
+            results[name] = run_endpoint(app, spec, args.requests, args.concurrency, offset)
+            offset += args.requests
+            if args.alloc_requests > 0:
+                results[name].update(measure_allocations(app, spec, args.alloc_requests, offset))
+                offset += args.alloc_requests + 1
+            r = results[name]
+            print(f"{name:<18}{r['throughput_rps']:>10} rps  p50 {r['p50_ms']:>9} ms  p99 {r['p99_ms']:>9} ms"
+                  f"  errors {r['errors']:>4}  peak {r.get('alloc_peak_kib', '-')} KiB")
+    finally:
+        for server in servers:
+            server.terminate()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_regression):
+            print(f"\nRegression above {args.max_regression}%")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Serves a fake LiveKit RoomService over Twirp (protobuf) with configurable latency.
+
+The server starts with `--rooms` rooms named bench-0, bench-1, ... each holding
+`--participants` participants (user-0, user-1, ...) with one audio and one video
+track, created `--room-age` seconds ago. Room and participant changes made
+through the API are kept in memory.
+
+Usage:
+    python scripts/fake_livekit_server.py --port 7880 --latency 20 --rooms 50 --participants 20
+
+Point LIVEKIT_URL at http://127.0.0.1:7880; any LIVEKIT_API_KEY/SECRET is accepted.
+"""
+import time
+import random
+import asyncio
+import argparse
+
+from aiohttp import web
+from livekit.protocol import models, room as room_pb
+
+PROTOBUF = "application/protobuf"
+
+
+class FakeRoomService:
+    def __init__(self, rooms: int, participants: int, room_age: float = 0):
+        self.rooms = {}
+        self.participants = {}
+        created_at = int(time.time() - room_age)
+        for r in range(rooms):
+            name = f"bench-{r}"
+            self.rooms[name] = models.Room(name=name, sid=f"RM_{r}", max_participants=participants * 2,
+                                           creation_time=created_at)
+            self.participants[name] = {
+                f"user-{p}": self.make_participant(r, p) for p in range(participants)
+            }
+            self.rooms[name].num_participants = participants
+
+    @staticmethod
+    def make_participant(room_index: int, index: int) -> models.ParticipantInfo:
+        return models.ParticipantInfo(
+            sid=f"PA_{room_index}_{index}", identity=f"user-{index}", name=f"User {index}",
+            state=models.ParticipantInfo.ACTIVE, joined_at=1700000000 + index,
+            tracks=[
+                models.TrackInfo(sid=f"TR_A_{room_index}_{index}", type=models.TrackType.AUDIO, name="mic"),
+                models.TrackInfo(sid=f"TR_V_{room_index}_{index}", type=models.TrackType.VIDEO, name="camera",
+                                 width=1280, height=720),
+            ],
+        )
+
+    def _room_members(self, name: str) -> dict:
+        if name not in self.rooms:
+            raise LookupError("room not found")
+        return self.participants.setdefault(name, {})
+
+    def _participant(self, room: str, identity: str) -> models.ParticipantInfo:
+        participant = self._room_members(room).get(identity)
+        if participant is None:
+            raise LookupError("participant not found")
+        return participant
+
+    def CreateRoom(self, req: room_pb.CreateRoomRequest):
+        room = self.rooms.setdefault(req.name, models.Room(
+            name=req.name, sid=f"RM_{req.name}", max_participants=req.max_participants,
+            creation_time=int(time.time())))
+        self.participants.setdefault(req.name, {})
+        return room
+
+    def ListRooms(self, req: room_pb.ListRoomsRequest):
+        rooms = [self.rooms[n] for n in req.names if n in self.rooms] if req.names else list(self.rooms.values())
+        return room_pb.ListRoomsResponse(rooms=rooms)
+
+    def DeleteRoom(self, req: room_pb.DeleteRoomRequest):
+        self.rooms.pop(req.room, None)
+        self.participants.pop(req.room, None)
+        return room_pb.DeleteRoomResponse()
+
+    def ListParticipants(self, req: room_pb.ListParticipantsRequest):
+        return room_pb.ListParticipantsResponse(participants=list(self._room_members(req.room).values()))
+
+    def GetParticipant(self, req: room_pb.RoomParticipantIdentity):
+        return self._participant(req.room, req.identity)
+
+    def RemoveParticipant(self, req: room_pb.RoomParticipantIdentity):
+        self._participant(req.room, req.identity)
+        del self.participants[req.room][req.identity]
+        self.rooms[req.room].num_participants = len(self.participants[req.room])
+        return room_pb.RemoveParticipantResponse()
+
+    def MutePublishedTrack(self, req: room_pb.MuteRoomTrackRequest):
+        for track in self._participant(req.room, req.identity).tracks:
+            if track.sid == req.track_sid:
+                track.muted = req.muted
+                return room_pb.MuteRoomTrackResponse(track=track)
+        raise LookupError("track not found")
+
+    def UpdateParticipant(self, req: room_pb.UpdateParticipantRequest):
+        participant = self._participant(req.room, req.identity)
+        if req.metadata:
+            participant.metadata = req.metadata
+        if req.HasField("permission"):
+            participant.permission.CopyFrom(req.permission)
+        return participant
+
+    def MoveParticipant(self, req: room_pb.MoveParticipantRequest):
+        participant = self._participant(req.room, req.identity)
+        del self.participants[req.room][req.identity]
+        self._room_members(req.destination_room)[req.identity] = participant
+        self.rooms[req.room].num_participants = len(self.participants[req.room])
+        self.rooms[req.destination_room].num_participants = len(self.participants[req.destination_room])
+        return room_pb.MoveParticipantResponse()
+
+
+REQUEST_TYPES = {
+    "CreateRoom": room_pb.CreateRoomRequest,
+    "ListRooms": room_pb.ListRoomsRequest,
+    "DeleteRoom": room_pb.DeleteRoomRequest,
+    "ListParticipants": room_pb.ListParticipantsRequest,
+    "GetParticipant": room_pb.RoomParticipantIdentity,
+    "RemoveParticipant": room_pb.RoomParticipantIdentity,
+    "MutePublishedTrack": room_pb.MuteRoomTrackRequest,
+    "UpdateParticipant": room_pb.UpdateParticipantRequest,
+    "MoveParticipant": room_pb.MoveParticipantRequest,
+}
+
+
+def make_app(args) -> web.Application:
+    service = FakeRoomService(args.rooms, args.participants, args.room_age)
+
+    async def handle(request):
+        method = request.match_info["method"]
+        if method not in REQUEST_TYPES:
+            return web.json_response({"code": "bad_route", "msg": f"unknown method {method}"}, status=404)
+        await asyncio.sleep(max(0.0, args.latency + random.uniform(-args.jitter, args.jitter)) / 1000)
+        req = REQUEST_TYPES[method]()
+        req.ParseFromString(await request.read())
+        try:
+            response = getattr(service, method)(req)
+        except LookupError as e:
+            return web.json_response({"code": "not_found", "msg": str(e)}, status=404)
+        return web.Response(body=response.SerializeToString(), content_type=PROTOBUF)
+
+    app = web.Application()
+    app.router.add_post("/twirp/livekit.RoomService/{method}", handle)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=7880)
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds added to every call")
+    parser.add_argument("--jitter", type=float, default=0, help="+/- milliseconds added to the latency")
+    parser.add_argument("--rooms", type=int, default=10, help="rooms created at startup")
+    parser.add_argument("--participants", type=int, default=10, help="participants per startup room")
+    parser.add_argument("--room-age", type=float, default=0, help="seconds since the startup rooms were created")
+    args = parser.parse_args()
+    web.run_app(make_app(args), port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Serves a fake OpenAI-compatible chat model with configurable latency and failures.
+
+Useful for exercising LLM routing and hedging locally: run two or more of these
+on different ports and point LLM_PROVIDERS at them. The answer echoes the last
+user message, streamed word by word when the request asks for a stream.
+
+Usage:
+    python scripts/fake_llm_server.py --port 8081 --latency 200 --slow-rate 0.1 --slow-latency 3000
+
+Then, for example:
+    LLM_PROVIDERS='[{"name": "a", "model": "fake", "api_key": "x", "base_url": "http://127.0.0.1:8081"},
+                    {"name": "b", "model": "fake", "api_key": "x", "base_url": "http://127.0.0.1:8082"}]'
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from aiohttp import web
+
+
+def completion_body(model: str, content: str) -> dict:
+    return {
+        "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def chunk_body(model: str, content: str) -> dict:
+    return {
+        "id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    }
+
+
+def make_app(args) -> web.Application:
+    async def chat(request):
+        body = await request.json()
+        if random.random() < args.error_rate:
+            return web.json_response({"error": {"message": "injected failure"}}, status=503)
+        latency = args.slow_latency if random.random() < args.slow_rate else args.latency
+        await asyncio.sleep(max(0.0, latency + random.uniform(-args.jitter, args.jitter)) / 1000)
+
+        words = f"{args.prefix} {body['messages'][-1]['content']}".split(" ")
+        if not body.get("stream"):
+            return web.json_response(completion_body(body["model"], " ".join(words)))
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i, word in enumerate(words):
+            chunk = chunk_body(body["model"], word if i == 0 else " " + word)
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(args.token_delay / 1000)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/openai/v1/chat/completions", chat)
+    app.router.add_post("/v1/chat/completions", chat)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0, help="+/- milliseconds added to the latency")
+    parser.add_argument("--slow-rate", type=float, default=0, help="fraction of requests that take --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=0, help="milliseconds for slow requests")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with a 503")
+    parser.add_argument("--token-delay", type=float, default=10, help="milliseconds between streamed words")
+    parser.add_argument("--prefix", default="Hello from the fake model, you said:")
+    args = parser.parse_args()
+    web.run_app(make_app(args), port=args.port)
+
+
+if __name__ == "__main__":
+    main()
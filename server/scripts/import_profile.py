@@ -0,0 +1,138 @@
+"""Reports where a cold start of the server spends its time.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+breaks the import time of app.main down by top-level package (self time, so
+the rows add up to the total). Then, for each endpoint, starts another fresh
+interpreter that imports the app and serves one request, which is what a
+serverless cold start pays for `/getToken` or `/listRooms`. Listing routes are
+served by scripts/fake_livekit_server.py on a free port.
+
+Usage:
+    python scripts/import_profile.py
+    python scripts/import_profile.py --endpoints getToken,listRooms --prewarm --output benchmarks/startup.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+from benchmark import SERVER_DIR, free_port, start_server
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+REQUESTS = {
+    "getToken": ("POST", "/getToken", {"roomName": "bench-0", "identity": "cold-start"}),
+    "listRooms": ("GET", "/listRooms", None),
+    "listParticipants": ("POST", "/listParticipants", {"roomName": "bench-0"}),
+    "joinRoom": ("POST", "/joinRoom", {"roomName": "bench-0", "username": "cold-start", "mode": "full"}),
+}
+
+# Runs in the fresh interpreter; prints one JSON line with the timings in ms
+COLD_REQUEST = """
+import sys, json, time
+start = time.perf_counter()
+from app.main import app, limiter, startup_stats, warm_up
+imported = time.perf_counter()
+limiter.enabled = False
+if {prewarm}:
+    warm_up()
+method, path, body = json.loads(sys.argv[1])
+request_start = time.perf_counter()
+response = app.test_client().open(path, method=method, json=body)
+response.get_data()
+done = time.perf_counter()
+print(json.dumps({{
+    "status": response.status_code,
+    "import_ms": round((imported - start) * 1000, 2),
+    "warm_up_ms": startup_stats["warm_up_ms"],
+    "first_request_ms": round((done - request_start) * 1000, 2),
+    "total_ms": round((done - start) * 1000, 2),
+    "modules_loaded": len(sys.modules),
+}}))
+"""
+
+
+def import_breakdown(env: dict) -> dict:
+    """Self time of each top-level package imported by app.main, in ms."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True)
+    packages = defaultdict(float)
+    total = 0.0
+    started = False
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        # Imports before app.main's own (site, .pth files) are part of every interpreter start
+        if not started and not name.startswith("app"):
+            continue
+        started = True
+        packages[name.split(".")[0]] += int(self_us) / 1000
+        if name == "app.main" and not indent:
+            total = int(cumulative_us) / 1000
+            break
+    return {"total_ms": round(total, 2),
+            "packages": {name: round(ms, 2) for name, ms in sorted(packages.items(), key=lambda kv: -kv[1])}}
+
+
+def cold_request(env: dict, name: str, prewarm: bool) -> dict:
+    result = subprocess.run([sys.executable, "-c", COLD_REQUEST.format(prewarm=prewarm), json.dumps(REQUESTS[name])],
+                            cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default="getToken,listRooms", help=f"comma-separated, from {', '.join(REQUESTS)}")
+    parser.add_argument("--top", type=int, default=15, help="packages shown in the breakdown")
+    parser.add_argument("--prewarm", action="store_true", help="also measure with warm_up() before the request")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server setting")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    names = args.endpoints.split(",")
+    unknown = [name for name in names if name not in REQUESTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    livekit_port = free_port()
+    server = start_server("fake_livekit_server.py", livekit_port)
+    try:
+        env = {
+            **os.environ,
+            "PYTHONPATH": SERVER_DIR,
+            "LIVEKIT_URL": f"http://127.0.0.1:{livekit_port}",
+            "LIVEKIT_API_KEY": "bench-key",
+            "LIVEKIT_API_SECRET": "bench-secret-bench-secret-bench-secret",
+            "GROQ_API_KEY": "bench",
+            **dict(item.split("=", 1) for item in args.env),
+        }
+        breakdown = import_breakdown(env)
+        print(f"import app.main: {breakdown['total_ms']} ms")
+        for package, ms in list(breakdown["packages"].items())[:args.top]:
+            print(f"  {package:<24}{ms:>9.2f} ms")
+
+        cold = {}
+        print(f"\n{'endpoint':<18}{'mode':<9}{'import ms':>11}{'warm-up ms':>12}{'request ms':>12}{'total ms':>10}{'modules':>9}")
+        for name in names:
+            for prewarm in ([False, True] if args.prewarm else [False]):
+                mode = "prewarm" if prewarm else "lazy"
+                r = cold.setdefault(name, {})[mode] = cold_request(env, name, prewarm)
+                print(f"{name:<18}{mode:<9}{r['import_ms']:>11}{str(r['warm_up_ms'] or '-'):>12}"
+                      f"{r['first_request_ms']:>12}{r['total_ms']:>10}{r['modules_loaded']:>9}")
+    finally:
+        server.terminate()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"imports": breakdown, "cold_requests": cold}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
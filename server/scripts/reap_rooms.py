@@ -0,0 +1,59 @@
+"""Deletes idle LiveKit rooms once, outside the server.
+
+Uses the same RoomReaper as the server's background sweep, against the LiveKit
+server in LIVEKIT_URL (LIVEKIT_API_KEY/SECRET from the environment or .env).
+A single pass has no history of when rooms were last active, so an empty room
+counts as idle once it is older than --idle-timeout; run with --dry-run first.
+
+Usage:
+    python scripts/reap_rooms.py --idle-timeout 3600 --dry-run
+    python scripts/reap_rooms.py --idle-timeout 3600 --pinned "lobby,demo-*" --max-concurrent 8
+
+Try it against scripts/fake_livekit_server.py --participants 0 --room-age 7200.
+"""
+import os
+import sys
+import argparse
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(SERVER_DIR, ".env"))
+
+from app.services.event_loop import run_sync
+from app.services.livekit_api_service import fetch_rooms, delete_room
+from app.services.room_reaper import RoomReaper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idle-timeout", type=float, default=float(os.getenv("ROOM_IDLE_TIMEOUT", "1800")),
+                        help="seconds a room must have been empty")
+    parser.add_argument("--pinned", default=os.getenv("ROOM_REAPER_PINNED", ""),
+                        help="comma-separated glob patterns of rooms to keep")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="deletes in flight at once")
+    parser.add_argument("--dry-run", action="store_true", help="only print the rooms that would be deleted")
+    # run_sync would otherwise apply ASYNC_CALL_TIMEOUT (30s), which a large sweep can outlast
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds the whole sweep may take")
+    args = parser.parse_args()
+
+    reaper = RoomReaper(
+        fetch_rooms,
+        delete_room,
+        idle_timeout=args.idle_timeout,
+        max_concurrent=args.max_concurrent,
+        pinned=[p.strip() for p in args.pinned.split(",") if p.strip()],
+        idle_from_creation=True
+    )
+    rooms = run_sync(reaper.sweep(dry_run=args.dry_run), timeout=args.timeout)
+    verb = "Would delete" if args.dry_run else "Deleted"
+    print(f"{verb} {len(rooms)} idle room(s)" + (f": {', '.join(rooms)}" if rooms else ""))
+    if reaper.failed:
+        print(f"{reaper.failed} delete(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
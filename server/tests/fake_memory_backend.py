@@ -0,0 +1,38 @@
+import threading
+from app.services.memory_backends import MemoryBackend
+
+
+class FakeMemoryBackend(MemoryBackend):
+    """In-memory MemoryBackend that records every write.
+
+    The first `fail_times` writes raise, and `gate`, if given, is waited on
+    before each write, so tests can hold the writer thread.
+    """
+
+    min_score = 0.0
+
+    def __init__(self, fail_times: int = 0, gate: threading.Event = None):
+        self.fail_times = fail_times
+        self.gate = gate
+        self.calls = []
+        self.memories = {}
+        self.started = threading.Event()
+
+    def add(self, messages: list, user_id: str):
+        self.add_many(messages, [user_id])
+
+    def add_many(self, messages: list, user_ids: list):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("memory backend unavailable")
+        self.calls.append((list(user_ids), list(messages)))
+        for user_id in user_ids:
+            self.memories.setdefault(user_id, []).extend(m["content"] for m in messages)
+
+    def search(self, query: str, user_id: str, limit: int = 5) -> list:
+        words = set(query.lower().split())
+        matches = [text for text in self.memories.get(user_id, []) if words & set(text.lower().split())]
+        return [{"memory": text, "score": 1.0, "user_id": user_id} for text in matches[:limit]]
@@ -0,0 +1,93 @@
+import threading
+from app.services.memory_queue import MemoryWriteQueue
+from app.services.memory_backends import LocalVectorBackend
+from fake_memory_backend import FakeMemoryBackend
+
+
+def turn(question, answer="ok"):
+    return [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+
+def make_queue(backend, **options):
+    options.setdefault("flush_interval", 0.05)
+    options.setdefault("retry_backoff", 0.001)
+    return MemoryWriteQueue(add=lambda messages, user_ids: backend.add_many(messages, user_ids), **options)
+
+
+def test_room_and_user_writes_share_one_call():
+    backend = FakeMemoryBackend()
+    queue = make_queue(backend)
+    queue.flush([(turn("hello"), ["alice_lobby", "alice"])])
+    assert backend.calls == [(["alice_lobby", "alice"], turn("hello"))]
+
+
+def test_identical_turns_are_deduplicated():
+    backend = FakeMemoryBackend()
+    queue = make_queue(backend)
+    queue.flush([(turn("hello"), ["alice_lobby", "alice"])] * 2)
+    assert len(backend.calls) == 1
+    assert queue.deduped == 2
+
+
+def test_turns_of_one_user_are_merged_across_rooms():
+    backend = FakeMemoryBackend()
+    queue = make_queue(backend)
+    queue.flush([(turn("in lobby"), ["alice_lobby", "alice"]), (turn("in cafe"), ["alice_cafe", "alice"])])
+    calls = {tuple(user_ids): messages for user_ids, messages in backend.calls}
+    assert calls == {
+        ("alice_lobby",): turn("in lobby"),
+        ("alice_cafe",): turn("in cafe"),
+        ("alice",): turn("in lobby") + turn("in cafe"),
+    }
+
+
+def test_failed_writes_are_retried():
+    backend = FakeMemoryBackend(fail_times=2)
+    written = []
+    queue = make_queue(backend, max_retries=3, on_write=written.append)
+    queue.flush([(turn("hello"), ["alice_lobby", "alice"])])
+    assert queue.retries == 2 and queue.written == 1 and queue.failed == 0
+    assert written == ["alice_lobby", "alice"]
+
+
+def test_writes_are_dropped_after_max_retries():
+    backend = FakeMemoryBackend(fail_times=10)
+    queue = make_queue(backend, max_retries=1)
+    queue.flush([(turn("hello"), ["alice"])])
+    assert queue.failed == 1 and backend.calls == []
+
+
+def test_queue_depth_is_bounded():
+    gate = threading.Event()
+    backend = FakeMemoryBackend(gate=gate)
+    queue = make_queue(backend, max_depth=1, batch_size=1)
+    assert queue.enqueue(turn("first"), ["alice"])
+    # The writer thread holds the first turn; one more fits in the queue
+    assert backend.started.wait(5)
+    assert queue.enqueue(turn("second"), ["alice"])
+    assert not queue.enqueue(turn("third"), ["alice"])
+    assert queue.dropped == 1
+    gate.set()
+    queue.close()
+    assert [messages for _, messages in backend.calls] == [turn("first"), turn("second")]
+
+
+def test_close_drains_pending_turns():
+    backend = FakeMemoryBackend()
+    queue = make_queue(backend, flush_interval=0.5)
+    for i in range(5):
+        queue.enqueue(turn(f"question {i}"), [f"user{i}_lobby", f"user{i}"])
+    queue.close()
+    assert sorted(user_id for user_ids, _ in backend.calls for user_id in user_ids) == sorted(
+        [f"user{i}" for i in range(5)] + [f"user{i}_lobby" for i in range(5)]
+    )
+    assert backend.search("question 3", "user3") == [{"memory": "question 3", "score": 1.0, "user_id": "user3"}]
+
+
+def test_local_backend_stores_one_embedding_for_every_id(tmp_path):
+    backend = LocalVectorBackend(str(tmp_path), dim=64)
+    backend.add_many(turn("my favourite colour is green", "noted"), ["alice_lobby", "alice"])
+    for user_id in ("alice_lobby", "alice"):
+        [result] = backend.search("favourite colour", user_id)
+        assert result["memory"].startswith("User said: my favourite colour is green")
+    assert backend.search("favourite colour", "bob") == []